@@ -0,0 +1,34 @@
+from typing import Optional
+from aliases import CURRENCY_ALIASES
+
+
+class AliasIndex:
+    def __init__(self, aliases: dict = None):
+        """
+        Prefix trie over currency aliases for longest-prefix lookups
+        :param aliases: Mapping of lower-case alias to ISO code, defaults to CURRENCY_ALIASES
+        """
+        if aliases is None:
+            aliases = CURRENCY_ALIASES
+        self.root = {}
+        for alias, code in aliases.items():
+            node = self.root
+            for ch in alias:
+                node = node.setdefault(ch, {})
+            # The empty key can never collide with a single character edge
+            node[""] = code
+
+    def lookup(self, token: str) -> Optional[str]:
+        """
+        Find the currency for a token such as "dollars" or "рублей"
+        :param token: Lower-case candidate token
+        :return: ISO code of the longest alias the token starts with, None if there is none
+        """
+        node = self.root
+        code = None
+        for ch in token:
+            node = node.get(ch)
+            if node is None:
+                break
+            code = node.get("", code)
+        return code
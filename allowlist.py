@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+from dotenv import dotenv_values
+
+logger = logging.getLogger(__name__)
+
+
+def parse_ids(value) -> frozenset:
+    """
+    Parse a comma separated id list such as "123,-100456" once, for O(1) membership checks
+    :raises ValueError: if an entry is not an integer
+    """
+    if not value:
+        return frozenset()
+    if isinstance(value, str):
+        value = value.split(",")
+    return frozenset(int(item) for item in (str(item).strip() for item in value) if item)
+
+
+class Allowlist:
+    def __init__(self, user_ids="", chat_ids="", path: str = None):
+        """
+        Users and chats the bot answers. A chat on the list is served whatever the user; with both lists
+        empty everybody is served.
+        :param user_ids: Comma separated user ids (or an iterable of ids)
+        :param chat_ids: Comma separated chat ids (or an iterable of ids)
+        :param path: Optional dotenv style file with ALLOWED_USER_IDS / ALLOWED_CHAT_IDS lines; when it
+                     exists it takes precedence and reload() picks up edits without a restart
+        """
+        self.path = path
+        self.users = parse_ids(user_ids)
+        self.chats = parse_ids(chat_ids)
+        self.restricted = bool(self.users or self.chats)
+        self.reloads = 0
+        self._mtime = None
+        self._watch_task = None
+        if path and os.path.exists(path):
+            self.reload()
+
+    def is_allowed(self, user_id: int, chat_id: int = None) -> bool:
+        """Hot path gate, two set lookups at most"""
+        if not self.restricted:
+            return True
+        return chat_id in self.chats or user_id in self.users
+
+    def reload(self) -> bool:
+        """
+        Re-read the allowlist file, keeping the current lists if it is missing or invalid
+        :return: True if the lists were replaced
+        """
+        try:
+            self._mtime = os.stat(self.path).st_mtime_ns
+            values = dotenv_values(self.path)
+            users = parse_ids(values.get("ALLOWED_USER_IDS"))
+            chats = parse_ids(values.get("ALLOWED_CHAT_IDS"))
+        except (OSError, ValueError) as e:
+            logger.warning("Could not reload allowlist from %s: %r", self.path, e)
+            return False
+
+        # No await in between, so handlers never see one list updated without the other
+        self.users, self.chats = users, chats
+        self.restricted = bool(users or chats)
+        self.reloads += 1
+        logger.info("Allowlist reloaded: %d users, %d chats", len(users), len(chats))
+        return True
+
+    def start_watching(self, interval: float = 5.0):
+        """Reload on the running event loop whenever the file's modification time changes"""
+        if self.path and (self._watch_task is None or self._watch_task.done()):
+            self._watch_task = asyncio.ensure_future(self._watch(interval))
+
+    async def _watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime != self._mtime:
+                self.reload()
+
+    def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
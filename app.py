@@ -1,37 +1,163 @@
+import asyncio
+import logging
 import os
+import signal
 from dotenv import load_dotenv
-from telegram.ext import Application, MessageHandler, CallbackQueryHandler, filters
+from telegram.ext import Application, MessageHandler, CallbackQueryHandler, InlineQueryHandler, filters
 from currencies_handler import CurrenciesHandler
 from reply_builder import ReplyBuilder
 from handlers import CurrencyMessageHandler
+from metrics import METRICS
 from aliases import CURRENCIES
+from rate_cache import CACHE_FILES
 
 
-def main():
-    # Load environment variables
-    load_dotenv()
-
+def build_application(webhook: bool = False, workers: int = 1, leader: bool = True) -> Application:
+    """
+    Create the bot application from environment variables
+    :param webhook: Updates are fed in by a WebhookServer instead of long polling
+    :param workers: Number of webhook worker processes sharing the rate cache and rate limits
+    :param leader: This process keeps the shared rate cache refreshed
+    """
     # Initialize components
     api_url = os.getenv("API_URL")
     token_api = os.getenv("TOKEN_API")
     token_bot = os.getenv("TOKEN_BOT")
     allowed_user_ids = os.getenv("ALLOWED_USER_IDS", "")
     allowed_chat_ids = os.getenv("ALLOWED_CHAT_IDS", "")
+    # Optional file with ALLOWED_USER_IDS / ALLOWED_CHAT_IDS lines, re-read on change or SIGHUP
+    allowlist_file = os.getenv("ALLOWLIST_FILE") or None
+    # Optional single base (e.g. USD) from which all cross rates are derived locally
+    pivot_currency = os.getenv("PIVOT_CURRENCY") or None
+    # The memory-mapped binary cache loads in constant time on restart; it lives in rates_cache.bin and
+    # starts from an existing rates_cache.json. "json" keeps writing rates_cache.json.
+    cache_format = os.getenv("RATES_CACHE_FORMAT", "binary")
+    cache_file = CACHE_FILES[cache_format]
+    # Every fetched snapshot is appended here; set to an empty string to disable history
+    history_file = os.getenv("RATES_HISTORY_FILE", "rates_history.sqlite3")
+    shared = workers > 1
 
     # Create service instances
-    currencies_handler = CurrenciesHandler(api_url, CURRENCIES, token_api)
+    currencies_handler = CurrenciesHandler(api_url, CURRENCIES, token_api, cache_file=cache_file,
+                                           pivot=pivot_currency, cache_format=cache_format,
+                                           history_file=history_file, shared_cache=shared,
+                                           legacy_cache_file=CACHE_FILES["json"])
     reply_builder = ReplyBuilder()
-    currency_handler = CurrencyMessageHandler(currencies_handler, reply_builder, allowed_user_ids, allowed_chat_ids)
+    rate_limiter = None
+    if shared:
+        # Single process deployments never load the SQLite limiter
+        from shared_rate_limiter import SharedRateLimiter
+        rate_limiter = SharedRateLimiter(os.getenv("RATE_LIMIT_FILE", "rate_limits.sqlite3"))
+    currency_handler = CurrencyMessageHandler(currencies_handler, reply_builder, allowed_user_ids, allowed_chat_ids,
+                                              rate_limiter=rate_limiter, allowlist_file=allowlist_file)
+    # Read only when metrics are rendered or dumped
+    METRICS.register("currency_prefilter", currency_handler.prefilter.get_stats,
+                     "Messages passed to or kept from the parser")
+    METRICS.register("rates", currencies_handler.get_stats, "Rate cache and upstream fetch counters")
+    METRICS.register("reply_builder", reply_builder.get_stats, "Reply memo counters")
+    METRICS.register("messages", currency_handler.get_stats, "Message handler counters")
+    # Seconds between metric snapshots in the log, 0 disables them
+    metrics_dump_interval = float(os.getenv("METRICS_DUMP_INTERVAL", "0"))
+
+    async def startup(application: Application):
+        # The rates client is set up in a thread while the bot connects, not inside the first rate fetch
+        currencies_handler.warm_up()
+        # Keep rates warm so user messages are answered from cache; other workers read the leader's cache file
+        if leader:
+            currencies_handler.start_background_refresh()
+        if METRICS.enabled and metrics_dump_interval > 0:
+            METRICS.start_periodic_dump(metrics_dump_interval)
+        if allowlist_file:
+            currency_handler.allowlist.start_watching()
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, currency_handler.allowlist.reload)
+
+    async def shutdown(application: Application):
+        # Release the pooled HTTP connections used for rate fetching
+        await currencies_handler.aclose()
+        currency_handler.allowlist.stop_watching()
+        METRICS.stop_periodic_dump()
+        if rate_limiter is not None:
+            rate_limiter.close()
 
     # Set up the application
-    app = Application.builder().token(token_bot).build()
+    builder = Application.builder().token(token_bot).post_init(startup).post_shutdown(shutdown)
+    if webhook:
+        # Polling never loads the webhook server
+        from webhook_server import InFlightUpdateProcessor
+        # Updates arrive through WebhookServer; handle up to WEBHOOK_CONCURRENCY of them at once
+        builder = builder.updater(None).concurrent_updates(
+            InFlightUpdateProcessor(int(os.getenv("WEBHOOK_CONCURRENCY", "32"))))
+    app = builder.build()
 
     # Add handlers
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, currency_handler.handle_message))
     app.add_handler(CallbackQueryHandler(currency_handler.handle_callback))
+    # Inline mode must also be enabled for the bot in @BotFather. Polling processes updates one at a time,
+    # so there the handler is non-blocking and the next keystroke is processed while the debounce of the
+    # previous one sleeps. Webhook updates already run concurrently, and blocking keeps the inline query
+    # counted as pending until it is answered.
+    app.add_handler(InlineQueryHandler(currency_handler.handle_inline_query, block=webhook))
+    return app
+
+
+def run_webhook_worker(worker_index: int = 0, workers: int = 1):
+    """Serve webhook updates in this process; all workers listen on the same port"""
+    from webhook_server import WebhookServer
+    load_dotenv()
+    configure_observability()
+    leader = worker_index == 0
+    if workers > 1:
+        # Each worker keeps its own metrics; scrapes land on whichever worker accepts the connection
+        METRICS.const_labels = {"worker": str(worker_index)}
+    server = WebhookServer(
+        build_application(webhook=True, workers=workers, leader=leader),
+        host=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+        port=int(os.getenv("WEBHOOK_PORT")),
+        url_path=os.getenv("WEBHOOK_PATH", "/telegram"),
+        secret_token=os.getenv("WEBHOOK_SECRET") or None,
+        # Registering the webhook once is enough
+        webhook_url=(os.getenv("WEBHOOK_URL") or None) if leader else None,
+        reuse_port=workers > 1,
+        metrics_path=os.getenv("METRICS_PATH", "/metrics") if METRICS.enabled else None,
+    )
+    METRICS.register("webhook", server.get_stats, "Webhook requests")
+    asyncio.run(server.serve_forever())
+
+
+def configure_observability():
+    """Logging from LOG_LEVEL (DEBUG also logs fetched rate payloads) and metrics from METRICS_ENABLED"""
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+                        level=os.getenv("LOG_LEVEL", "INFO").upper())
+    # httpx logs every request at INFO, including each long-polling getUpdates, httpcore every step at DEBUG
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    if os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes"):
+        METRICS.enable()
+
+
+def main():
+    # Load environment variables
+    load_dotenv()
+    configure_observability()
+
+    # Long polling unless a webhook port is configured
+    if not os.getenv("WEBHOOK_PORT"):
+        build_application().run_polling()
+        return
 
-    # Start the bot
-    app.run_polling()
+    # Worker 0 runs here, the others in child processes; the kernel spreads connections between them
+    import multiprocessing
+    workers = int(os.getenv("WEBHOOK_WORKERS", "1"))
+    processes = [multiprocessing.Process(target=run_webhook_worker, args=(index, workers), daemon=True)
+                 for index in range(1, workers)]
+    for process in processes:
+        process.start()
+    try:
+        run_webhook_worker(0, workers)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
 
 if __name__ == "__main__":
     main()
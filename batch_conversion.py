@@ -0,0 +1,89 @@
+import csv
+import json
+from itertools import islice
+from typing import Iterable, Iterator, Tuple
+import numpy as np
+
+
+def build_rate_matrix(currencies: list, rates_for) -> np.ndarray:
+    """
+    Dense conversion matrix
+    :param currencies: Currency codes, giving the row and column order
+    :param rates_for: Callable returning the {code: rate} dict for a base, or None if it is unknown
+    :return: N x N array where [i, j] converts currencies[i] into currencies[j], NaN where unknown
+    """
+    matrix = np.full((len(currencies), len(currencies)), np.nan)
+    for i, base in enumerate(currencies):
+        rates = rates_for(base)
+        if rates is None:
+            continue
+        matrix[i, i] = 1.0
+        for j, code in enumerate(currencies):
+            if code in rates:
+                matrix[i, j] = rates[code]
+    return matrix
+
+
+def iter_csv(path: str, amount_column: str = "amount", base_column: str = "base") -> Iterator[Tuple[float, str]]:
+    """Stream (amount, base) pairs from a CSV file with a header row"""
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            yield float(row[amount_column]), row[base_column].upper()
+
+
+def iter_jsonl(path: str, amount_key: str = "amount", base_key: str = "base") -> Iterator[Tuple[float, str]]:
+    """Stream (amount, base) pairs from a file with one JSON object per line"""
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield float(record[amount_key]), record[base_key].upper()
+
+
+class BatchConverter:
+    def __init__(self, currencies_handler):
+        """
+        Vectorized conversion of many amounts at once, for offline jobs such as ledgers
+        :param currencies_handler: CurrenciesHandler providing the rates
+        """
+        self.currencies_handler = currencies_handler
+        self.index = {code: i for i, code in enumerate(currencies_handler.currencies)}
+        self._matrix = None
+        self._matrix_version = None
+
+    def get_rate_matrix(self) -> np.ndarray:
+        """Rate matrix over the handler's currencies, rebuilt only after the cached rates change"""
+        handler = self.currencies_handler
+        if self._matrix is None or self._matrix_version != handler.rates_version:
+            self._matrix = build_rate_matrix(handler.currencies, handler.get_any_cached_rates)
+            self._matrix_version = handler.rates_version
+        return self._matrix
+
+    def convert(self, amounts, bases) -> np.ndarray:
+        """
+        Convert amounts given in various base currencies into every supported currency
+        :param amounts: Sequence or array of amounts
+        :param bases: Base currency code for each amount
+        :return: Array of shape (len(amounts), len(currencies)), columns in the handler's currencies order
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        codes, inverse = np.unique(np.asarray(bases), return_inverse=True)
+        unknown = [str(code) for code in codes if code not in self.index]
+        if unknown:
+            raise ValueError(f"Unsupported base currencies: {', '.join(unknown)}")
+
+        # One rate lookup per distinct base, not per row
+        for code in codes:
+            self.currencies_handler.fetch_exchange_rates(str(code))
+        rows = np.array([self.index[code] for code in codes], dtype=np.intp)
+        return amounts[:, None] * self.get_rate_matrix()[rows[inverse.ravel()]]
+
+    def convert_stream(self, pairs: Iterable[Tuple[float, str]], chunk_size: int = 100000) -> Iterator[np.ndarray]:
+        """Convert an (amount, base) stream chunk by chunk so memory stays bounded by chunk_size"""
+        pairs = iter(pairs)
+        while True:
+            chunk = list(islice(pairs, chunk_size))
+            if not chunk:
+                return
+            amounts, bases = zip(*chunk)
+            yield self.convert(amounts, bases)
@@ -0,0 +1 @@
+"""Micro-benchmarks for the bot's hot paths. Run from the repo root, e.g. ``python -m benchmarks.parser``."""
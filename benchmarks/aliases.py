@@ -0,0 +1,58 @@
+import argparse
+import random
+import time
+from alias_index import AliasIndex
+from aliases import CURRENCY_ALIASES
+
+LETTERS = "abcdefghijklmnopqrstuvwxyzабвгдеёжзийклмнопрстуфхцчшщыэюя"
+
+
+def synthetic_aliases(count: int, seed: int = 0) -> dict:
+    """Real aliases padded with random inflected-looking words mapped to fake codes"""
+    rnd = random.Random(seed)
+    aliases = dict(CURRENCY_ALIASES)
+    while len(aliases) < count:
+        word = "".join(rnd.choice(LETTERS) for _ in range(rnd.randint(3, 14)))
+        aliases.setdefault(word, f"X{len(aliases) % 1000:03d}")
+    return aliases
+
+
+def linear_lookup(aliases: dict, token: str):
+    """The scan _add_if_valid_currency used before the index existed"""
+    for alias, code in aliases.items():
+        if token.startswith(alias):
+            return code
+    return None
+
+
+def time_lookups(lookup, tokens: list, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for token in tokens:
+            lookup(token)
+        best = min(best, time.perf_counter() - start)
+    return len(tokens) / best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Alias lookup: linear scan vs prefix trie")
+    arg_parser.add_argument("--tokens", type=int, default=2000)
+    arg_parser.add_argument("--rounds", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    rnd = random.Random(1)
+    for count in (100, 1000, 10000, 100000):
+        aliases = synthetic_aliases(count)
+        keys = list(aliases)
+        # Half real inflected hits, half misses
+        tokens = [rnd.choice(keys) + "ов" if i % 2 else "x" + rnd.choice(keys) for i in range(args.tokens)]
+        index = AliasIndex(aliases)
+        linear = time_lookups(lambda token: linear_lookup(aliases, token), tokens, args.rounds)
+        indexed = time_lookups(index.lookup, tokens, args.rounds)
+        print(f"{count:>7,} aliases: linear {linear:>12,.0f} lookups/sec, "
+              f"trie {indexed:>12,.0f} lookups/sec ({indexed / linear:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
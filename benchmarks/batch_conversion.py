@@ -0,0 +1,50 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from aliases import CURRENCIES
+from currencies_handler import CurrenciesHandler
+from rate_cache import RateCacheStore
+
+
+def offline_handler(directory: str) -> CurrenciesHandler:
+    """Handler answering from a freshly written pivot cache, so no upstream calls are made"""
+    path = os.path.join(directory, "rates_cache.json")
+    rnd = random.Random(0)
+    RateCacheStore(path).save(datetime.utcnow(), {"USD": {code: rnd.uniform(0.5, 500) for code in CURRENCIES if code != "USD"}})
+    return CurrenciesHandler(None, CURRENCIES, cache_file=path, pivot="USD")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Batch conversion throughput vs the per-item loop")
+    arg_parser.add_argument("--rows", type=int, default=1000000)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        handler = offline_handler(directory)
+        rnd = random.Random(1)
+        amounts = [rnd.uniform(1, 10000) for _ in range(args.rows)]
+        bases = [rnd.choice(CURRENCIES) for _ in range(args.rows)]
+
+        start = time.perf_counter()
+        for amount, base in zip(amounts, bases):
+            handler.get_converted_amounts(amount, base)
+        loop = args.rows / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        handler.convert_batch(amounts, bases)
+        batch = args.rows / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in handler.convert_stream(zip(amounts, bases), chunk_size=100000):
+            pass
+        stream = args.rows / (time.perf_counter() - start)
+
+    print(f"{args.rows:,} rows: per-item loop {loop:,.0f} rows/sec, convert_batch {batch:,.0f} rows/sec "
+          f"({batch / loop:.0f}x), convert_stream {stream:,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import json
+import random
+from itertools import accumulate
+from aliases import CURRENCY_ALIAS_GROUPS
+
+# Small chat-like corpus shared by the benchmarks: most group traffic has no amount at all
+CHATTER = [
+    "привет всем, как дела?",
+    "ok see you tomorrow",
+    "кто идет на обед?",
+    "lol that's hilarious",
+    "скинь ссылку пожалуйста",
+    "the meeting moved to 10:30",
+    "я сегодня работаю из дома",
+    "does anyone know a good dentist",
+    "ну это просто жесть какая-то",
+    "sent you the file, check it",
+    "завтра будет дождь, возьмите зонты",
+    "who broke the build again",
+]
+
+CURRENCY_MESSAGES = [
+    "100 usd",
+    "сколько будет 250 евро?",
+    "1.5m eur",
+    "он должен мне 100k рублей",
+    "два ляма рублей",
+    "three hundred dollars",
+    "миллион рублей это много",
+    "20 фунтов и 300 грн",
+    "1,250.50 czk за билет",
+    "пять тысяч тенге",
+]
+
+
+def build_corpus(size: int = 10000, currency_share: float = 0.2) -> list:
+    """Return a deterministic list of messages with the given share of currency mentions"""
+    every = max(1, round(1 / currency_share)) if currency_share else 0
+    messages = []
+    for i in range(size):
+        if every and i % every == 0:
+            messages.append(CURRENCY_MESSAGES[(i // every) % len(CURRENCY_MESSAGES)])
+        else:
+            messages.append(CHATTER[i % len(CHATTER)])
+    return messages
+
+
+# Building blocks for large synthetic corpora
+_CHATTER_BY_LANGUAGE = {
+    "en": CHATTER[1::2] + ["standup in 5 min, room 4", "flight lands at 18:45", "I ran 10 km today 🏃",
+                           "ticket #4521 is fixed", "3 more reviews and we ship"],
+    "ru": CHATTER[0::2] + ["созвон в 15:00", "купил 2 кг яблок", "на улице -12, одевайтесь теплее",
+                           "в 3 часа буду дома", "осталось 5 задач до релиза"],
+    "uk": ["привіт, як справи?", "зустрінемось о 19:00", "дякую за допомогу!", "в мене 2 квитки на концерт"],
+    "de": ["guten morgen zusammen", "wir treffen uns um 12 uhr", "danke, bis später", "ich habe 3 katzen"],
+    "es": ["hola a todos", "nos vemos a las 9", "¿alguien tiene un cargador?", "compré 2 pizzas"],
+}
+_TEMPLATES = {
+    "en": ["{amount} {currency}", "how much is {amount} {currency}?", "paid {amount} {currency} for lunch",
+           "rent went up to {amount} {currency} 😬", "can someone convert {amount} {currency}", "{currency}{amount}"],
+    "ru": ["{amount} {currency}", "сколько будет {amount} {currency}?", "отдал {amount} {currency} за билеты",
+           "зарплата {amount} {currency} это норм?", "скинул тебе {amount} {currency}"],
+    "uk": ["скільки це {amount} {currency}?", "заплатив {amount} {currency} за квартиру"],
+}
+_AMOUNT_WORDS = {
+    "en": ["one", "two", "five", "ten", "twenty", "fifty", "hundred", "three hundred", "twenty five"],
+    "ru": ["один", "два", "пять", "десять", "двадцать", "сто", "пятьсот", "двести пятьдесят"],
+}
+
+
+def _synthetic_amount(rnd: random.Random, language: str) -> str:
+    form = rnd.random()
+    if form < 0.45:
+        return str(rnd.choice([1, 2, 5, 10, 20, 50, 99, 100, 250, 500, 1000, 2500]))
+    if form < 0.6:
+        return f"{rnd.uniform(1, 100000):,.2f}"
+    if form < 0.75:
+        return f"{rnd.choice(['1.5', '2', '10', '100', '300'])}{rnd.choice(['k', 'm', 'к', ' тыс', ' млн'])}"
+    words = _AMOUNT_WORDS.get(language, _AMOUNT_WORDS["en"])
+    amount = rnd.choice(words)
+    if form > 0.9:
+        amount += " " + rnd.choice(["тысяч", "thousand", "million", "миллионов", "лямов"])
+    return amount
+
+
+def generate_messages(size: int, currency_share: float = 0.2, users: int = 10000, chats: int = 200,
+                      messages_per_second: float = 20.0, seed: int = 0):
+    """
+    Deterministic stream of synthetic multilingual chat messages for replay benchmarks
+    :param size: Number of messages
+    :param currency_share: Fraction of messages mentioning an amount
+    :param users: Distinct senders; activity follows Zipf's law, so a few users send many messages
+    :param chats: Distinct chats
+    :param messages_per_second: Mean arrival rate, sets the simulated "ts" of each message
+    :param seed: Random seed
+    :return: Iterator of {"ts", "user_id", "chat_id", "text"} dicts
+    """
+    rnd = random.Random(seed)
+    languages = list(_CHATTER_BY_LANGUAGE)
+    aliases = [alias for group in CURRENCY_ALIAS_GROUPS.values() for alias in group]
+    user_weights = list(accumulate(1 / rank for rank in range(1, users + 1)))
+    ts = 0.0
+    for _ in range(size):
+        ts += rnd.expovariate(messages_per_second)
+        language = rnd.choices(languages, weights=[40, 40, 8, 6, 6])[0]
+        if rnd.random() < currency_share:
+            template = rnd.choice(_TEMPLATES.get(language, _TEMPLATES["en"]))
+            text = template.format(amount=_synthetic_amount(rnd, language), currency=rnd.choice(aliases))
+            if rnd.random() < 0.1:
+                # Several amounts in one message
+                text += " и " + rnd.choice(_TEMPLATES["ru"]).format(
+                    amount=_synthetic_amount(rnd, "ru"), currency=rnd.choice(aliases))
+        else:
+            text = rnd.choice(_CHATTER_BY_LANGUAGE[language])
+            if rnd.random() < 0.05:
+                # Occasional long message
+                text = " ".join(rnd.choice(_CHATTER_BY_LANGUAGE[language]) for _ in range(rnd.randint(5, 30)))
+        yield {
+            "ts": round(ts, 3),
+            "user_id": rnd.choices(range(1, users + 1), cum_weights=user_weights)[0],
+            "chat_id": -1000 - rnd.randrange(chats),
+            "text": text,
+        }
+
+
+def read_jsonl(path: str):
+    """Replay corpus records from a JSONL file; a bare string per line is a message without metadata"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield {"text": record} if isinstance(record, str) else record
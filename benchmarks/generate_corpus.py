@@ -0,0 +1,28 @@
+import argparse
+import json
+import sys
+from benchmarks.corpus import generate_messages
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Write a synthetic multilingual chat corpus as JSONL")
+    arg_parser.add_argument("--size", type=int, default=100000)
+    arg_parser.add_argument("--currency-share", type=float, default=0.2)
+    arg_parser.add_argument("--users", type=int, default=10000)
+    arg_parser.add_argument("--chats", type=int, default=200)
+    arg_parser.add_argument("--rate", type=float, default=20.0, help="mean simulated messages per second")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--out", help="output file, stdout if omitted")
+    args = arg_parser.parse_args()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        for record in generate_messages(args.size, args.currency_share, args.users, args.chats, args.rate, args.seed):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import random
+import re
+import time
+from currency_parser import CurrencyParser, MULTIPLIERS, _CURRENCY, _trie_pattern
+from word_numbers import WORD_NUMBERS, phrase_value
+
+PHRASES = (
+    "two hundred fifty", "one hundred and five", "twenty-five", "a thousand two hundred", "nine hundred ninety nine",
+    "three million four hundred thousand", "five k", "полтора миллиона", "двести пятьдесят тысяч",
+    "сто двадцать три", "миллион пятьсот тысяч", "девятьсот девяносто девять", "два ляма", "трёхсот",
+)
+CURRENCY_WORDS = ("dollars", "euros", "pounds", "рублей", "евро", "гривен", "тенге", "yen")
+FILLER = ("maybe", "about", "then", "около", "где-то", "ну", "и", "and", "ok", "price")
+
+_NUMBER_WORDS = _trie_pattern(WORD_NUMBERS)
+_MULTIPLIER_WORDS = _trie_pattern(MULTIPLIERS)
+# The three alternation grammars that handled spelled out amounts before phrase_value
+LEGACY_GRAMMARS = (
+    re.compile(r"(" + _NUMBER_WORDS + r")\s+(" + _MULTIPLIER_WORDS + r")\s+" + _CURRENCY, re.IGNORECASE),
+    re.compile(r"(" + _MULTIPLIER_WORDS + r")\s+" + _CURRENCY, re.IGNORECASE),
+    re.compile(r"(" + _NUMBER_WORDS + r")\s+" + _CURRENCY, re.IGNORECASE),
+)
+
+
+def number_heavy_message(rnd: random.Random, words: int) -> str:
+    """Spelled out numbers with the odd filler word, a currency after roughly every fourth number"""
+    parts = []
+    while len(parts) < words:
+        parts.extend(rnd.choice(PHRASES).split())
+        parts.append(rnd.choice(CURRENCY_WORDS) if rnd.random() < 0.25 else rnd.choice(FILLER))
+    return " ".join(parts[:words])
+
+
+def legacy_scan(text: str) -> int:
+    return sum(1 for grammar in LEGACY_GRAMMARS for _ in grammar.finditer(text))
+
+
+def time_messages(function, messages: list, rounds: int) -> float:
+    """Best words per second over rounds"""
+    words = sum(len(text.split()) for text in messages)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for text in messages:
+            function(text)
+        best = min(best, time.perf_counter() - start)
+    return words / best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Spelled out amounts: legacy alternation grammars vs the phrase_value state machine")
+    arg_parser.add_argument("--messages", type=int, default=200)
+    arg_parser.add_argument("--rounds", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    parser = CurrencyParser()
+    rnd = random.Random(0)
+    # Telegram caps messages at 4096 characters, roughly 600 of these words
+    for words in (10, 50, 200, 600):
+        messages = [number_heavy_message(rnd, words) for _ in range(args.messages)]
+        legacy = time_messages(legacy_scan, messages, args.rounds)
+
+        phrase_value.cache_clear()
+        start = time.perf_counter()
+        for text in messages:
+            parser._try_parse_spoken_amount(text)
+        cold = sum(len(text.split()) for text in messages) / (time.perf_counter() - start)
+        warm = time_messages(parser._try_parse_spoken_amount, messages, args.rounds)
+        info = phrase_value.cache_info()
+        print(f"{words:>5} words/message: legacy grammars {legacy:>12,.0f} words/sec (no composition), "
+              f"state machine cold {cold:>12,.0f}, memoized {warm:>12,.0f} words/sec "
+              f"(memo {info.hits / (info.hits + info.misses):.0%} hits, {info.currsize} phrases)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import argparse
+import time
+from currency_parser import CurrencyParser
+from prefilter import CurrencyPrefilter
+from benchmarks.corpus import build_corpus
+
+
+def run(size: int, currency_share: float, rounds: int, prefilter: CurrencyPrefilter = None) -> float:
+    parser = CurrencyParser()
+    messages = build_corpus(size, currency_share)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for text in messages:
+            if prefilter is None or prefilter.may_contain_currency(text):
+                parser.parse(text)
+        best = min(best, time.perf_counter() - start)
+    return len(messages) / best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="CurrencyParser.parse throughput")
+    arg_parser.add_argument("--size", type=int, default=20000)
+    arg_parser.add_argument("--rounds", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    for share in (0.0, 0.2, 1.0):
+        rate = run(args.size, share, args.rounds)
+        prefilter = CurrencyPrefilter()
+        filtered_rate = run(args.size, share, args.rounds, prefilter)
+        stats = prefilter.get_stats()
+        print(f"currency share {share:>4.0%}: {rate:>12,.0f} messages/sec, "
+              f"with prefilter {filtered_rate:>12,.0f} messages/sec "
+              f"({stats['rejected_ratio']:.0%} rejected before parsing)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from rate_cache import RateCacheStore
+
+
+def synthetic_rates(count: int, seed: int = 0) -> dict:
+    rnd = random.Random(seed)
+    codes = [f"C{i:03d}" for i in range(count)]
+    return {base: {code: rnd.uniform(0.001, 1000) for code in codes if code != base} for base in codes}
+
+
+def time_load(store: RateCacheStore, rounds: int) -> float:
+    """Best time to load the cache and read one row, which is what a restarted bot needs to answer"""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        _, rates = store.load()
+        rates[next(iter(rates))]
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Rate cache load time, JSON vs memory-mapped binary")
+    arg_parser.add_argument("--rounds", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (8, 100, 500):
+            rates = synthetic_rates(count)
+            line = f"{count:>4} currencies:"
+            for cache_format in ("json", "binary"):
+                store = RateCacheStore(os.path.join(directory, f"cache.{cache_format}"), cache_format)
+                store.save(datetime.utcnow(), rates)
+                size = os.path.getsize(store.path)
+                line += f"  {cache_format} {time_load(store, args.rounds) * 1000:>9.3f} ms ({size / 1024:,.0f} KiB)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from aliases import CURRENCIES
+from rate_history import RateHistory
+
+
+def populate(history: RateHistory, start: datetime, hours: int, seed: int = 0):
+    """Hourly snapshots for every base in CURRENCIES"""
+    rnd = random.Random(seed)
+    batch = []
+    for hour in range(hours):
+        moment = start + timedelta(hours=hour)
+        for base in CURRENCIES:
+            batch.append((base, moment, {code: rnd.uniform(0.001, 500) for code in CURRENCIES if code != base}))
+        if len(batch) >= 50000:
+            history.extend(batch)
+            batch = []
+    history.extend(batch)
+
+
+def best_of(func, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="RateHistory size and lookup latency")
+    arg_parser.add_argument("--years", type=int, default=3)
+    arg_parser.add_argument("--rounds", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    start = datetime(2023, 1, 1)
+    hours = args.years * 365 * 24
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.sqlite3")
+        history = RateHistory(path)
+        begin = time.perf_counter()
+        populate(history, start, hours)
+        elapsed = time.perf_counter() - begin
+        snapshots = hours * len(CURRENCIES)
+        history._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"{snapshots:,} snapshots written in {elapsed:.1f}s, {os.path.getsize(path) / 2**20:.1f} MiB on disk")
+
+        rnd = random.Random(1)
+        moments = [start + timedelta(seconds=rnd.randrange(hours * 3600)) for _ in range(1000)]
+        nearest = best_of(lambda: [history.nearest("USD", moment) for moment in moments], args.rounds)
+        print(f"nearest snapshot: {nearest / len(moments) * 1e6:,.1f} us per lookup")
+
+        middle = start + timedelta(hours=hours // 2)
+        for label, span in (("1 day", timedelta(days=1)), ("30 days", timedelta(days=30)), ("1 year", timedelta(days=365))):
+            elapsed = best_of(lambda: history.summarize("USD", "EUR", middle, middle + span), args.rounds)
+            print(f"range summary over {label:>7}: {elapsed * 1000:,.2f} ms")
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
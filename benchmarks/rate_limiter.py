@@ -0,0 +1,47 @@
+import argparse
+import time
+import tracemalloc
+from rate_limiter import RateLimiter
+
+
+class SimulatedClock:
+    """Advances by a fixed step on every read so a run covers many rate-limit windows"""
+    def __init__(self, step: float):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self) -> float:
+        self.now += self.step
+        return self.now
+
+
+def run(users: int, span: float) -> RateLimiter:
+    limiter = RateLimiter(limit=5, window=60, clock=SimulatedClock(span / users))
+    for user_id in range(users):
+        limiter.is_allowed(user_id)
+    return limiter
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="RateLimiter throughput and memory with many distinct users")
+    arg_parser.add_argument("--users", type=int, default=1000000)
+    arg_parser.add_argument("--span", type=float, default=600.0, help="simulated seconds the users arrive over")
+    args = arg_parser.parse_args()
+
+    # Timed and memory-traced separately, tracemalloc slows every allocation down
+    limiter = run(args.users, args.span)
+    start = time.perf_counter()
+    limiter = run(args.users, args.span)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run(args.users, args.span)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{args.users:,} distinct users over {args.span:.0f}s simulated: "
+          f"{args.users / elapsed:,.0f} checks/sec, {len(limiter.user_requests):,} users tracked at the end, "
+          f"peak {peak / 2**20:,.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
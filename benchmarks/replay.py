@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import islice
+from aliases import CURRENCIES
+from currencies_handler import CurrenciesHandler
+from handlers import CurrencyMessageHandler
+from rate_limiter import RateLimiter
+from reply_builder import ReplyBuilder
+from benchmarks.corpus import generate_messages, read_jsonl
+from benchmarks.stub_upstream import StubUpstream
+
+STAGES = ("parse", "rate_limit", "fetch", "render", "total")
+# Regression checks compare these; p99 of short runs is noisy, hence the separate tolerance below
+COMPARED_PERCENTILES = ("p50_us", "p99_us")
+
+
+class ReplayClock:
+    """Rate limiter clock that follows the recorded message timestamps instead of the wall clock"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def summarize(samples: list) -> dict:
+    """Latency distribution in microseconds"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1e6, 2)
+
+    return {
+        "count": len(ordered),
+        "mean_us": round(sum(ordered) / len(ordered) * 1e6, 2),
+        "p50_us": percentile(0.50),
+        "p90_us": percentile(0.90),
+        "p99_us": percentile(0.99),
+        "p999_us": percentile(0.999),
+        "max_us": round(ordered[-1] * 1e6, 2),
+    }
+
+
+def build_handler(upstream: StubUpstream, directory: str, cache_ttl: float, pivot: str, clock: ReplayClock):
+    currencies_handler = CurrenciesHandler(upstream.url, CURRENCIES, "bench",
+                                           cache_file=os.path.join(directory, "rates_cache.json"),
+                                           cache_ttl=cache_ttl, pivot=pivot)
+    return CurrencyMessageHandler(currencies_handler, ReplyBuilder(), "", "",
+                                  rate_limiter=RateLimiter(limit=5, window=60, clock=clock))
+
+
+async def replay(records: list, handler: CurrencyMessageHandler, clock: ReplayClock) -> dict:
+    """Push every record through the same stages as handle_message, timing each one"""
+    timings = {stage: [] for stage in STAGES}
+    counters = {"messages": 0, "with_amounts": 0, "rate_limited": 0, "replies": 0}
+    prefilter, parser = handler.prefilter, handler.currency_parser
+    limiter, builder = handler.rate_limiter, handler.reply_builder
+    perf_counter = time.perf_counter
+
+    start = perf_counter()
+    for record in records:
+        clock.now = record.get("ts", clock.now)
+        text = record["text"]
+        counters["messages"] += 1
+
+        t0 = perf_counter()
+        pairs = parser.parse(text) if prefilter.may_contain_currency(text) else []
+        t1 = perf_counter()
+        timings["parse"].append(t1 - t0)
+        if pairs:
+            counters["with_amounts"] += 1
+            allowed = limiter.is_allowed(record.get("user_id", 0))
+            t2 = perf_counter()
+            timings["rate_limit"].append(t2 - t1)
+            if not allowed:
+                counters["rate_limited"] += 1
+            else:
+                conversions = await handler.convert_pairs(pairs[:handler.max_values_per_message])
+                t3 = perf_counter()
+                timings["fetch"].append(t3 - t2)
+                replies = [builder.build_html(amount, base, result, version)
+                           for amount, base, result, version in conversions]
+                timings["render"].append(perf_counter() - t3)
+                counters["replies"] += len(replies)
+        timings["total"].append(perf_counter() - t0)
+    counters["elapsed_seconds"] = perf_counter() - start
+    return {"timings": timings, "counters": counters}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(records: list, args) -> dict:
+    upstream = StubUpstream(latency=args.upstream_latency)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            clock = ReplayClock()
+            handler = build_handler(upstream, directory, args.cache_ttl, args.pivot, clock)
+            result = asyncio.run(_run_and_close(replay(records, handler, clock), handler))
+            result["upstream"] = {"requests": upstream.requests, **handler.currencies_handler.get_stats()}
+            result["prefilter"] = handler.prefilter.get_stats()
+
+            peak_traced = None
+            if args.trace_memory:
+                # Separate pass on fresh components, tracemalloc slows every allocation down
+                clock = ReplayClock()
+                handler = build_handler(upstream, directory, args.cache_ttl, args.pivot, clock)
+                tracemalloc.start()
+                asyncio.run(_run_and_close(replay(records, handler, clock), handler))
+                _, peak_traced = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+    finally:
+        upstream.close()
+    result["peak_traced_bytes"] = peak_traced
+    return result
+
+
+async def _run_and_close(coroutine, handler: CurrencyMessageHandler):
+    try:
+        return await coroutine
+    finally:
+        await handler.currencies_handler.aclose()
+
+
+def compare(report: dict, baseline: dict, tolerance: float, tail_tolerance: float) -> list:
+    """Human readable regressions of report against baseline"""
+    regressions = []
+    old, new = baseline["throughput_messages_per_sec"], report["throughput_messages_per_sec"]
+    if new < old * (1 - tolerance):
+        regressions.append(f"throughput {old:,.0f} -> {new:,.0f} messages/sec")
+    for stage in STAGES:
+        for key in COMPARED_PERCENTILES:
+            old = baseline["stages"].get(stage, {}).get(key)
+            new = report["stages"].get(stage, {}).get(key)
+            allowed = tail_tolerance if key == "p99_us" else tolerance
+            if old and new and new > old * (1 + allowed):
+                regressions.append(f"{stage} {key} {old:,.2f} -> {new:,.2f}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Replay a chat corpus through parser, rate limiter, rates handler and reply builder; "
+                    "prints a JSON report")
+    arg_parser.add_argument("--corpus", help="JSONL file of {ts, user_id, chat_id, text} records "
+                                             "(see benchmarks.generate_corpus); synthetic if omitted")
+    arg_parser.add_argument("--size", type=int, default=50000, help="synthetic corpus size, or records read")
+    arg_parser.add_argument("--currency-share", type=float, default=0.2)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--cache-ttl", type=float, default=3600, help="seconds, lower it to exercise refetches")
+    arg_parser.add_argument("--upstream-latency", type=float, default=0.0, help="seconds per stub response")
+    arg_parser.add_argument("--pivot", default=None, help="e.g. USD to fetch one base and derive cross rates")
+    arg_parser.add_argument("--trace-memory", action="store_true", help="also measure peak Python heap (slow)")
+    arg_parser.add_argument("--out", help="write the report here instead of stdout")
+    arg_parser.add_argument("--compare", help="baseline report; exit with status 1 on regressions")
+    arg_parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown of throughput and p50")
+    arg_parser.add_argument("--tail-tolerance", type=float, default=0.5, help="allowed slowdown of p99")
+    args = arg_parser.parse_args()
+
+    if args.corpus:
+        records = list(islice(read_jsonl(args.corpus), args.size))
+    else:
+        records = list(generate_messages(args.size, args.currency_share, seed=args.seed))
+
+    result = run(records, args)
+
+    counters = result["counters"]
+    report = {
+        "benchmark": "replay",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "corpus": args.corpus or f"synthetic(size={args.size}, currency_share={args.currency_share}, seed={args.seed})",
+        "config": {"cache_ttl": args.cache_ttl, "upstream_latency": args.upstream_latency, "pivot": args.pivot},
+        "throughput_messages_per_sec": round(counters["messages"] / counters["elapsed_seconds"], 1),
+        "stages": {stage: summarize(samples) for stage, samples in result["timings"].items()},
+        "counters": counters,
+        "upstream": result["upstream"],
+        "prefilter": result["prefilter"],
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "peak_traced_bytes": result["peak_traced_bytes"],
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.tail_tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import argparse
+import random
+import time
+from aliases import CURRENCIES
+from reply_builder import ReplyBuilder
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="ReplyBuilder.build_html throughput")
+    arg_parser.add_argument("--replies", type=int, default=100000)
+    arg_parser.add_argument("--distinct", type=int, default=50, help="distinct (amount, base) requests in the mix")
+    args = arg_parser.parse_args()
+
+    rnd = random.Random(0)
+    requests = []
+    for _ in range(args.distinct):
+        base = rnd.choice(CURRENCIES)
+        amount = rnd.choice([1, 5, 10, 20, 50, 100, 250, 1000, 5000, 100000])
+        converted = {code: amount * rnd.uniform(0.01, 500) for code in CURRENCIES if code != base}
+        requests.append((amount, base, converted))
+    mix = [requests[rnd.randrange(len(requests))] for _ in range(args.replies)]
+
+    for label, version in (("rendered every time", None), ("memoized", 1)):
+        builder = ReplyBuilder()
+        start = time.perf_counter()
+        for amount, base, converted in mix:
+            builder.build_html(amount, base, converted, version)
+        rate = len(mix) / (time.perf_counter() - start)
+        print(f"{label:>20}: {rate:>12,.0f} replies/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from aliases import CURRENCIES
+from rate_cache import CACHE_FILES, CACHE_FORMATS, RateCacheStore
+
+# Runs in a fresh interpreter: the real build_application, then one message through the real handler
+CHILD = """
+import asyncio, json, time
+from types import SimpleNamespace
+marks = {"start": time.perf_counter()}
+import app
+marks["imported"] = time.perf_counter()
+application = app.build_application()
+marks["built"] = time.perf_counter()
+handler = application.handlers[0][0].callback.__self__
+
+async def reply_text(text, **kwargs):
+    marks.setdefault("first_reply", time.perf_counter())
+
+user = SimpleNamespace(id=1)
+update = SimpleNamespace(effective_user=user, effective_chat=SimpleNamespace(id=1),
+                         message=SimpleNamespace(text="100 usd to eur?", reply_text=reply_text))
+asyncio.run(handler.handle_message(update, None))
+print(json.dumps({key: value - marks["start"] for key, value in marks.items()}))
+"""
+
+PHASES = ("imported", "built", "first_reply")
+
+
+def write_cache(directory: str, cache_format: str, codes: int):
+    """Fresh rates for every supported base plus padding codes, the size of a full upstream snapshot"""
+    rnd = random.Random(0)
+    targets = list(CURRENCIES) + [f"X{i:02d}" for i in range(max(0, codes - len(CURRENCIES)))]
+    rates = {base: {code: rnd.uniform(0.5, 500) for code in targets if code != base} for base in CURRENCIES}
+    RateCacheStore(os.path.join(directory, CACHE_FILES[cache_format]), cache_format).save(datetime.utcnow(), rates)
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def run_once(directory: str, repo: str, cache_format: str) -> tuple:
+    """One cold start; returns (milliseconds per phase, -X importtime lines)"""
+    env = dict(os.environ, PYTHONPATH=repo, TOKEN_BOT="123456:startup-benchmark", API_URL="http://127.0.0.1:9",
+               RATES_CACHE_FORMAT=cache_format, RATES_HISTORY_FILE=os.path.join(directory, "history.sqlite3"))
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], cwd=directory, env=env,
+                             capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    marks = json.loads(process.stdout.strip().splitlines()[-1])
+    phases = {phase: marks[phase] * 1000 for phase in PHASES if phase in marks}
+    phases["process"] = wall * 1000
+    return phases, process.stderr.splitlines()
+
+
+def slowest_imports(lines: list, top: int) -> list:
+    """(cumulative microseconds, module) of the script's imports and theirs, as reported by -X importtime"""
+    imports = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # One space after the separator is a module the script imported, two more for each nesting level
+        if len(name) - len(name.lstrip()) <= 3:
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Cold start: interpreter and imports, build_application and time to the first reply")
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--codes", type=int, default=170, help="target currencies per cached base")
+    arg_parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    args = arg_parser.parse_args()
+
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = {cache_format: [] for cache_format in CACHE_FORMATS}
+    loads = {}
+    with tempfile.TemporaryDirectory() as root:
+        directories = {}
+        for cache_format in CACHE_FORMATS:
+            directories[cache_format] = os.path.join(root, cache_format)
+            os.mkdir(directories[cache_format])
+            write_cache(directories[cache_format], cache_format, args.codes)
+            store = RateCacheStore(os.path.join(directories[cache_format], CACHE_FILES[cache_format]))
+            loads[cache_format] = min(timed(store.load) for _ in range(args.runs))
+        # Interleaved, so drift on a busy machine hits both formats alike
+        for _ in range(args.runs):
+            for cache_format in CACHE_FORMATS:
+                runs[cache_format].append(run_once(directories[cache_format], repo, cache_format))
+
+    for cache_format, results in runs.items():
+        # Medians, cold starts are noisy
+        phases = {key: sorted(result[0][key] for result in results)[len(results) // 2] for key in results[0][0]}
+        print(f"{cache_format:>6} cache: snapshot load {loads[cache_format] * 1000:6.2f} ms, "
+              f"imports {phases['imported']:7.1f} ms, build_application {phases['built'] - phases['imported']:6.1f} ms, "
+              f"first reply {phases['first_reply']:7.1f} ms after script start, "
+              f"whole process {phases['process']:7.1f} ms")
+
+    print("slowest imports (last run):")
+    for cumulative, name in slowest_imports(results[-1][1], args.top):
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
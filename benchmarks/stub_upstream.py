@@ -0,0 +1,54 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Value of one USD in every currency the stub serves, roughly current market rates
+USD_RATES = {"USD": 1.0, "EUR": 0.92, "GBP": 0.79, "JPY": 151.3, "CZK": 23.4, "UAH": 41.2, "RUB": 92.5, "KZT": 447.0}
+
+
+class StubUpstream:
+    def __init__(self, usd_rates: dict = USD_RATES, latency: float = 0.0):
+        """
+        Local stand-in for CurrencyAPI's /v3/latest, serving cross rates derived from usd_rates
+        :param usd_rates: Value of one USD in every currency, USD itself included
+        :param latency: Seconds each response is delayed, to mimic a remote API
+        """
+        self.usd_rates = usd_rates
+        self.latency = latency
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                body = json.dumps(stub.response(parse_qs(urlparse(self.path).query))).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/v3/latest"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def response(self, query: dict) -> dict:
+        base = query.get("base_currency", ["USD"])[0]
+        codes = query["currencies"][0].split(",") if query.get("currencies") else list(self.usd_rates)
+        return {"data": {
+            code: {"code": code, "value": self.usd_rates[code] / self.usd_rates[base]}
+            for code in codes if code in self.usd_rates and code != base
+        }}
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
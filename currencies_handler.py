@@ -1,83 +1,467 @@
-import requests
-import json
+import asyncio
+import logging
+import os
+import httpx
 from datetime import datetime, timedelta
+from time import perf_counter
+from metrics import METRICS
+from rate_cache import RateCacheStore
+from rate_history import RateHistory
+
+logger = logging.getLogger(__name__)
+
+_UPSTREAM_SECONDS = METRICS.histogram("upstream_request_seconds", "Latency of single CurrencyAPI requests")
+
+# Upstream statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Shortest pause of the background refresher, also used as the retry delay after a failed refresh
+MIN_REFRESH_DELAY = 30
 
 class CurrenciesHandler:
-    def __init__(self, api_url, currencies, token=None, cache_file="rates_cache.json", cache_ttl=3600):
+    def __init__(self, api_url, currencies, token=None, cache_file="rates_cache.json", cache_ttl=3600,
+                 timeout=10.0, max_retries=3, retry_backoff=0.5, max_connections=10, pivot=None,
+                 stale_grace=600, refresh_ahead=60, cache_format="json", history_file=None, shared_cache=False,
+                 legacy_cache_file=None):
         """
         :param api_url: Base API URL for CurrencyAPI (e.g. https://api.currencyapi.com/v3/latest)
         :param currencies: List of supported currencies (e.g. ["EUR", "GBP", "JPY", "CZK"])
         :param token: API key for CurrencyAPI
         :param cache_file: File path to cache exchange rates
         :param cache_ttl: Time to live for cache in seconds
+        :param timeout: Timeout in seconds for a single upstream request
+        :param max_retries: Number of retries after a failed upstream request
+        :param retry_backoff: Delay in seconds before the first retry, doubled after each attempt
+        :param max_connections: Size of the keep-alive connection pool used by the async client
+        :param pivot: If set (e.g. "USD"), fetch only this base and derive every cross rate from it
+        :param stale_grace: Seconds past cache_ttl during which stale rates are still served while refreshing
+        :param refresh_ahead: Seconds before cache_ttl runs out at which the background refresher kicks in
+        :param cache_format: "json" or memory-mappable "binary" for writing the cache file
+        :param history_file: SQLite file that keeps every fetched snapshot, history is off if None
+        :param shared_cache: Other processes write cache_file too, pick up their fresher rates before fetching
+        :param legacy_cache_file: Older cache file to start from while cache_file does not exist yet
         """
         self.api_url = api_url
         self.currencies = currencies
         self.token = token
         self.cache_file = cache_file
+        self.cache_store = RateCacheStore(cache_file, cache_format, legacy_cache_file)
+        self.history = RateHistory(history_file) if history_file else None
         self.cache_ttl = timedelta(seconds=cache_ttl)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_connections = max_connections
+        self.pivot = pivot
+        self.stale_grace = timedelta(seconds=stale_grace)
+        self.refresh_ahead = timedelta(seconds=refresh_ahead)
+        self.shared_cache = shared_cache
+        self._cache_mtime = None
         self.last_fetched_time = None
         self.cached_rates = {}
+        # Bumped whenever cached_rates changes, so derived data (replies, matrices) can be cached against it
+        self.rates_version = 0
+        # Dense from -> to cross-rate table derived from the pivot rates (pivot mode only)
+        self.cross_rates = {}
+        self._client = None
+        self._warm_up_task = None
+        # In-flight upstream fetches keyed by base currency, shared by concurrent callers
+        self._inflight = {}
+        self._refresh_task = None
+        self._batch_converter = None
+        # Write-behind state: the async path persists snapshots without making callers wait on disk
+        self._save_task = None
+        self._save_pending = False
+        self._pending_history = []
+        self.upstream_fetches = 0
+        self.coalesced_fetches = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.stale_served = 0
+        self.failed_refreshes = 0
         self.read_cache()
 
     def read_cache(self):
+        self._cache_mtime = self._stat_cache_file()
         try:
-            with open(self.cache_file, "r") as f:
-                data = json.load(f)
-                self.last_fetched_time = datetime.fromisoformat(data["timestamp"])
-                self.cached_rates = data["rates"]
+            self.last_fetched_time, self.cached_rates = self.cache_store.load()
         except (FileNotFoundError, KeyError, ValueError):
             self.last_fetched_time = None
             self.cached_rates = {}
 
+        if self.pivot and self.pivot in self.cached_rates:
+            self.cross_rates = self._derive_cross_rates(self.cached_rates[self.pivot])
+        self.rates_version += 1
+
+    def _stat_cache_file(self):
+        try:
+            return os.stat(self.cache_file).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def reload_shared_cache(self) -> bool:
+        """
+        Adopt rates another process wrote to the cache file if they are newer than ours
+        :return: True if the cached rates changed
+        """
+        mtime = self._stat_cache_file()
+        if mtime is None or mtime == self._cache_mtime:
+            return False
+        self._cache_mtime = mtime
+        try:
+            fetched_at, rates = self.cache_store.load()
+        except (FileNotFoundError, KeyError, ValueError):
+            return False
+        if self.last_fetched_time and fetched_at <= self.last_fetched_time:
+            return False
+
+        # Bases only we have fetched are kept, the file's rows win otherwise
+        for base, base_rates in self.cached_rates.items():
+            if base not in rates:
+                rates[base] = base_rates
+        self.last_fetched_time = fetched_at
+        self.cached_rates = rates
+        if self.pivot and self.pivot in rates:
+            self.cross_rates = self._derive_cross_rates(rates[self.pivot])
+        self.rates_version += 1
+        return True
+
     def save_cache(self, rates: dict):
-        data = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "rates": rates
-        }
-        with open(self.cache_file, "w") as f:
-            json.dump(data, f, indent=4, sort_keys=True)
         self.last_fetched_time = datetime.utcnow()
         self.cached_rates = rates
+        self.rates_version += 1
+        self.cache_store.save(self.last_fetched_time, rates)
 
-    def fetch_exchange_rates(self, base: str) -> dict:
-        """Fetches fresh rates from CurrencyAPI or returns cache if valid"""
+    def save_cache_in_background(self, rates: dict):
+        """
+        Like save_cache, but the file write happens later in a worker thread. Writes requested while
+        one is running are coalesced into a single write of the latest rates.
+        """
+        self.last_fetched_time = datetime.utcnow()
+        self.cached_rates = rates
+        self.rates_version += 1
+        self._save_pending = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.ensure_future(self._write_behind())
+
+    async def _write_behind(self):
+        while self._save_pending:
+            self._save_pending = False
+            # Rows are replaced, never mutated, so a shallow copy is a stable snapshot for the writer
+            snapshot = dict(self.cached_rates)
+            history, self._pending_history = self._pending_history, []
+            try:
+                await asyncio.to_thread(self._write_snapshot, self.last_fetched_time, snapshot, history)
+            except Exception as e:
+                logger.warning("Saving rates failed: %r", e)
+
+    def _write_snapshot(self, fetched_at: datetime, rates: dict, history: list):
+        self.cache_store.save(fetched_at, rates)
+        if history:
+            self.history.extend(history)
+
+    def _get_cached_rates(self, base: str, max_age: timedelta = None):
+        """Returns cached rates for base if they are younger than max_age (cache_ttl by default), None otherwise"""
+        if max_age is None:
+            max_age = self.cache_ttl
+        upstream_base = self._upstream_base(base)
         if (
             self.last_fetched_time
-            and datetime.utcnow() - self.last_fetched_time < self.cache_ttl
-            and base in self.cached_rates
+            and datetime.utcnow() - self.last_fetched_time < max_age
+            and upstream_base in self.cached_rates
         ):
-            return self.cached_rates[base]
+            return self._select_rates(base, self.cached_rates[upstream_base])
+        return None
 
-        # Fetch from CurrencyAPI
-        response = requests.get(
-            self.api_url,
-            params={
-                "apikey": self.token,
-                "base_currency": base,
-                "currencies": ",".join([c for c in self.currencies if c != base])
-            },
-        )
-        response.raise_for_status()
-        data = response.json()
-        print("Fetched new rates:", data)
+    def _upstream_base(self, base: str) -> str:
+        """Base currency that actually has to be requested to answer for base"""
+        return self.pivot or base
+
+    def _select_rates(self, base: str, upstream_rates: dict) -> dict:
+        if self.pivot:
+            return self.cross_rates.get(base, {})
+        return upstream_rates
+
+    def _derive_cross_rates(self, pivot_rates: dict) -> dict:
+        """Builds the N x N table where converting from a to b uses pivot_rates[b] / pivot_rates[a]"""
+        pivot_rates = {**pivot_rates, self.pivot: 1.0}
+        known = [c for c in self.currencies if pivot_rates.get(c)]
+        return {
+            src: {dst: pivot_rates[dst] / pivot_rates[src] for dst in known if dst != src}
+            for src in known
+        }
 
+    def _request_params(self, base: str) -> dict:
+        return {
+            "apikey": self.token,
+            "base_currency": base,
+            "currencies": ",".join([c for c in self.currencies if c != base])
+        }
+
+    def _store_rates(self, base: str, data: dict) -> dict:
         # Parse response: {"data": {"EUR": {"value": 0.92}, "GBP": {"value": 0.79}, ...}}
         rates = {code: info["value"] for code, info in data["data"].items()}
 
-        # Update cache (per base currency)
+        # Update cache (per base currency), persisting it is up to the caller
         if not self.cached_rates:
             self.cached_rates = {}
         self.cached_rates[base] = rates
+        if base == self.pivot:
+            self.cross_rates = self._derive_cross_rates(rates)
+
+        return rates
+
+    def fetch_exchange_rates(self, base: str) -> dict:
+        """Fetches fresh rates from CurrencyAPI or returns cache if valid (blocking, for offline use)"""
+        cached = self._get_cached_rates(base)
+        if cached is not None:
+            return cached
+
+        # Fetch from CurrencyAPI
+        upstream_base = self._upstream_base(base)
+        # Only this blocking fallback needs requests, the bot itself fetches through httpx
+        import requests
+        response = requests.get(self.api_url, params=self._request_params(upstream_base), timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        logger.debug("Fetched %s rates: %s", upstream_base, data)
+
+        rates = self._store_rates(upstream_base, data)
         self.save_cache(self.cached_rates)
+        if self.history is not None:
+            self.history.append(upstream_base, self.last_fetched_time, rates)
+
+        return self._select_rates(base, rates)
+
+    async def fetch_exchange_rates_async(self, base: str) -> dict:
+        """Fetches fresh rates from CurrencyAPI or returns cache if valid, without blocking the event loop"""
+        cached = self._get_cached_rates(base)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+        if self.shared_cache and self.reload_shared_cache():
+            cached = self._get_cached_rates(base)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        # Stale while revalidate: answer from slightly expired rates and refresh in the background
+        upstream_base = self._upstream_base(base)
+        stale = self._get_cached_rates(base, self.cache_ttl + self.stale_grace)
+        if stale is not None:
+            self.stale_served += 1
+            self._get_refresh_task(upstream_base, waiting=False)
+            return stale
+
+        # Shielded so a cancelled caller does not cancel the fetch other callers wait on
+        self.cache_misses += 1
+        return self._select_rates(base, await asyncio.shield(self._get_refresh_task(upstream_base)))
+
+    def _get_refresh_task(self, upstream_base: str, waiting: bool = True) -> asyncio.Future:
+        """
+        Single flight: concurrent callers for the same upstream base share one fetch task
+        :param waiting: The caller awaits the task; only those count as coalesced when joining one in flight
+        """
+        task = self._inflight.get(upstream_base)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh_rates_async(upstream_base))
+            self._inflight[upstream_base] = task
+            task.add_done_callback(lambda done: self._forget_inflight(upstream_base, done))
+        elif waiting:
+            self.coalesced_fetches += 1
+        return task
+
+    async def _refresh_rates_async(self, base: str) -> dict:
+        self.upstream_fetches += 1
+        data = await self._request_rates_async(base)
+        logger.debug("Fetched %s rates: %s", base, data)
+
+        rates = self._store_rates(base, data)
+        self.save_cache_in_background(self.cached_rates)
+        if self.history is not None:
+            self._pending_history.append((base, self.last_fetched_time, rates))
 
         return rates
 
+    def _forget_inflight(self, base: str, task: asyncio.Future):
+        if self._inflight.get(base) is task:
+            del self._inflight[base]
+        # Background refreshes may have nobody awaiting them, so failures are recorded here
+        if not task.cancelled() and task.exception() is not None:
+            self.failed_refreshes += 1
+            logger.warning("Refreshing %s rates failed: %r", base, task.exception())
+
+    def warm_up(self):
+        """
+        Create the HTTP client in a worker thread on the running event loop. The first client imports the
+        transport and loads the CA bundle, which would otherwise stall the loop right when the first
+        message needs fresh rates.
+        """
+        if self._client is None and self._warm_up_task is None:
+            self._warm_up_task = asyncio.ensure_future(self._warm_up_client())
+
+    async def _warm_up_client(self):
+        client = await asyncio.to_thread(self._new_client)
+        # A fetch may have needed a client before the thread finished
+        if self._client is None or self._client.is_closed:
+            self._client = client
+        else:
+            await client.aclose()
+
+    def start_background_refresh(self):
+        """Starts refreshing cached rates ahead of expiry on the running event loop"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            if self.shared_cache:
+                self.reload_shared_cache()
+            if self._seconds_until_refresh() == 0:
+                bases = [self.pivot] if self.pivot else list(self.cached_rates)
+                for base in bases:
+                    try:
+                        await asyncio.shield(self._get_refresh_task(base))
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception:
+                        # Already reported by _forget_inflight; stale rates keep being served
+                        pass
+            await asyncio.sleep(max(self._seconds_until_refresh(), MIN_REFRESH_DELAY))
+
+    def _seconds_until_refresh(self) -> float:
+        """Seconds until the cache enters its refresh-ahead window, 0 if it already has or is empty"""
+        if not self.last_fetched_time:
+            return 0.0
+        age = datetime.utcnow() - self.last_fetched_time
+        return max((self.cache_ttl - self.refresh_ahead - age).total_seconds(), 0.0)
+
+    def get_historical_rates(self, base: str, moment: datetime):
+        """
+        Rates for base from the stored snapshot nearest to moment
+        :param base: Base currency code
+        :param moment: Naive UTC datetime to look up
+        :return: (fetched_at, rates) or None if there is no history for base
+        """
+        if self.history is None:
+            return None
+        snapshot = self.history.nearest(self._upstream_base(base), moment)
+        if snapshot is None:
+            return None
+        fetched_at, rates = snapshot
+        if self.pivot:
+            rates = self._derive_cross_rates(rates).get(base, {})
+        return fetched_at, rates
+
+    def get_cache_age(self):
+        """Seconds since the cached rates were fetched, None if there is no cache"""
+        if not self.last_fetched_time:
+            return None
+        return (datetime.utcnow() - self.last_fetched_time).total_seconds()
+
+    def get_stats(self) -> dict:
+        """
+        Cache and upstream fetch counters; hits were fresh, stale_served were answered from expired rates
+        while refreshing, misses had to wait for upstream. Coalesced fetches are callers that waited on an
+        in-flight request instead of starting one.
+        """
+        return {
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "upstream_fetches": self.upstream_fetches,
+            "coalesced_fetches": self.coalesced_fetches,
+            "failed_refreshes": self.failed_refreshes,
+            "stale_served": self.stale_served,
+            "cache_age_seconds": self.get_cache_age(),
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # One pooled client per handler so keep-alive connections are reused between fetches
+        if self._client is None or self._client.is_closed:
+            self._client = self._new_client()
+        return self._client
+
+    def _new_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+        )
+
+    async def _request_rates_async(self, base: str) -> dict:
+        """GET the rates for base, retrying transport errors and retryable statuses with exponential backoff"""
+        client = self._get_client()
+        delay = self.retry_backoff
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                if METRICS.enabled:
+                    start = perf_counter()
+                    try:
+                        response = await client.get(self.api_url, params=self._request_params(base))
+                    finally:
+                        _UPSTREAM_SECONDS.observe(perf_counter() - start)
+                else:
+                    response = await client.get(self.api_url, params=self._request_params(base))
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    response.raise_for_status()
+                    return response.json()
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+            await asyncio.sleep(delay)
+            delay *= 2
+
+    async def aclose(self):
+        """Stops the background refresher and closes the pooled HTTP client, call on application shutdown"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            self._warm_up_task = None
+        # Flush the pending write-behind before the history store is closed
+        if self._save_task is not None:
+            await self._save_task
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self.history is not None:
+            self.history.close()
+
+    def get_any_cached_rates(self, base: str):
+        """Returns cached rates for base however old they are, None if base was never fetched"""
+        return self._get_cached_rates(base, timedelta.max)
+
+    def _get_batch_converter(self):
+        if self._batch_converter is None:
+            # NumPy is only needed by offline batch jobs, so the bot does not import it
+            from batch_conversion import BatchConverter
+            self._batch_converter = BatchConverter(self)
+        return self._batch_converter
+
+    def convert_batch(self, amounts, bases):
+        """
+        Vectorized get_converted_amounts for many rows at once
+        :param amounts: Sequence or NumPy array of amounts
+        :param bases: Base currency code for each amount
+        :return: NumPy array of shape (len(amounts), len(self.currencies)), column j in self.currencies[j]
+        """
+        return self._get_batch_converter().convert(amounts, bases)
+
+    def convert_stream(self, pairs, chunk_size=100000):
+        """
+        Converts an iterable of (amount, base) pairs, e.g. from batch_conversion.iter_csv or iter_jsonl
+        :return: Iterator of NumPy arrays with at most chunk_size rows each
+        """
+        return self._get_batch_converter().convert_stream(pairs, chunk_size)
+
     def get_converted_amount(self, amount, rate):
         return amount * rate
 
-    def get_converted_amounts(self, amount, base):
-        rates = self.fetch_exchange_rates(base)  # This now returns the rates for the specific base currency
+    def get_converted_amounts(self, amount, base, rates=None):
+        if rates is None:
+            rates = self.fetch_exchange_rates(base)  # This now returns the rates for the specific base currency
         converted = {}
         for cur in self.currencies:
             if cur == base:
@@ -1,124 +1,167 @@
 import re
+from time import perf_counter
 from typing import List, Tuple
-from aliases import CURRENCY_ALIASES
-from word_numbers import WORD_NUMBERS
+from alias_index import AliasIndex
+from metrics import METRICS
+from word_numbers import ABBREVIATION, AMOUNT_WORDS, NUMBER_TOKENS, SCALE, phrase_value
+
+# Every scale word the spoken amount state machine knows, so "2 тысячи" and "2 billion" scale like "2k"
+MULTIPLIERS = {word: value for word, (value, kind) in NUMBER_TOKENS.items() if kind in (SCALE, ABBREVIATION)}
+# Shorthand spellings accepted after digits only ("5 млион"), the spoken amount grammar doesn't know them
+MULTIPLIERS.update({'mllion': 1000000, 'млион': 1000000, 'млионов': 1000000, 'млнов': 1000000})
+
+
+def _trie_pattern(words) -> str:
+    """Build a prefix-factored regex alternation that, like a longest-first list, prefers 'тысяча' over 'тысяч'"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if "" in node else body
+
+    return build(trie)
+
+
+# Grammars are compiled once at import time instead of on every parse() call
+_NUMBER = r"(\d{1,3}(?:,\d{3})*(?:\.\d+)?|\d+(?:\.\d+)?)"
+_CURRENCY = r"([a-zA-Zа-яА-Я€$¥£₽₴кчКЧ]+)"
+_AMOUNT_WORDS = _trie_pattern(AMOUNT_WORDS)
+
+NUMBER_MULTIPLIER_CURRENCY_RE = re.compile(
+    _NUMBER + r"\s*(" + _trie_pattern(MULTIPLIERS) + r")[.\s]*" + _CURRENCY,
+    re.IGNORECASE,
+)
+# Word tokens for spelled out amounts; same characters as _CURRENCY plus "ё"
+WORD_TOKEN_RE = re.compile(r"[a-zA-Zа-яА-ЯёЁ€$¥£₽₴]+")
+NUMBER_CURRENCY_RE = re.compile(_NUMBER + r"[.\s]*" + _CURRENCY, re.IGNORECASE)
+
+ALIAS_INDEX = AliasIndex()
+
+# Single scan that tells which strategies can possibly match: digit runs feed the
+# numeric strategies, a number word followed by whitespace feeds the spoken
+# amount strategy. A message with neither is rejected without running any grammar.
+_FEATURES_RE = re.compile(r"(\d+)|(?:" + _AMOUNT_WORDS + r")\s", re.IGNORECASE)
+
+
+# (metric label, method, grammar needs digits rather than words), in the priority order of parse()
+STRATEGIES = (
+    ("number_multiplier_currency", "_try_parse_number_multiplier_currency", True),
+    ("spoken_amount", "_try_parse_spoken_amount", False),
+    ("number_currency", "_try_parse_number_currency", True),
+)
+_STRATEGY_SECONDS = {
+    label: METRICS.histogram("currency_parse_strategy_seconds", "Time spent in each CurrencyParser strategy",
+                             strategy=label)
+    for label, _, _ in STRATEGIES
+}
+
 
 class CurrencyParser:
     def __init__(self):
-        self.multipliers = {
-            'k': 1000, 'к': 1000, 'thousand': 1000, 'тыс': 1000, 'тысяч': 1000,
-            'm': 1000000, 'м': 1000000, 'mil': 1000000, 'млн': 1000000,
-            'million': 1000000, 'миллион': 1000000, 'лям': 1000000, 'лимон': 1000000,
-            'ляма': 1000000, 'лимона': 1000000, 'миллиона': 1000000, 'миллионов': 1000000
-        }
+        self.multipliers = MULTIPLIERS
 
     def parse(self, text: str) -> List[Tuple[float, str]]:
         """Main entry point for currency parsing"""
-        # Try each parsing strategy in order of priority
-        results = self._try_parse_number_multiplier_currency(text)
-        if results:
-            return results
-
-        results = self._try_parse_word_number_multiplier_currency(text)
-        if results:
-            return results
-
-        results = self._try_parse_multiplier_currency(text)
-        if results:
-            return results
-
-        results = self._try_parse_word_number_currency(text)
-        if results:
-            return results
-
-        results = self._try_parse_number_currency(text)
-        return results
+        has_digits, has_words = self._scan_features(text)
+        if METRICS.enabled:
+            return self._parse_timed(text, has_digits, has_words)
+
+        # Try each parsing strategy in order of priority, skipping the ones
+        # whose grammar cannot match this text
+        if has_digits:
+            results = self._try_parse_number_multiplier_currency(text)
+            if results:
+                return results
+
+        if has_words:
+            results = self._try_parse_spoken_amount(text)
+            if results:
+                return results
+
+        if has_digits:
+            return self._try_parse_number_currency(text)
+        return []
+
+    def _parse_timed(self, text: str, has_digits: bool, has_words: bool) -> List[Tuple[float, str]]:
+        """parse() driven by the STRATEGIES table, recording how long each strategy takes"""
+        for label, method, needs_digits in STRATEGIES:
+            if not (has_digits if needs_digits else has_words):
+                continue
+            start = perf_counter()
+            results = getattr(self, method)(text)
+            _STRATEGY_SECONDS[label].observe(perf_counter() - start)
+            if results:
+                return results
+        return []
+
+    def _scan_features(self, text: str) -> Tuple[bool, bool]:
+        """Single pass over text returning (has digits, has number/multiplier words)"""
+        has_digits = has_words = False
+        for match in _FEATURES_RE.finditer(text):
+            if match.group(1) is not None:
+                has_digits = True
+            else:
+                has_words = True
+            if has_digits and has_words:
+                break
+        return has_digits, has_words
 
     def _try_parse_number_multiplier_currency(self, text: str) -> List[Tuple[float, str]]:
         """Try to parse text as number + multiplier + currency (e.g., '100k usd', '1.5m eur')"""
         results = []
-        pattern = r"(\d{1,3}(?:,\d{3})*(?:\.\d+)?|\d+(?:\.\d+)?)\s*((?:k|к|thousand|тыс|тысяч|mil|млн|million|миллион|лям|ляма|лимон|лимона|m|м)(?:illion|llion|л(?:ио)?н(?:ов)?)?)[.\s]*([a-zA-Zа-яА-Я€$¥£₽₴кчКЧ]+)"
-
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            try:
-                amount_str = match.group(1).replace(',', '')
-                amount = float(amount_str)
-                multiplier_text = match.group(2)
-                currency = match.group(3).lower()
-
-                base_multiplier = multiplier_text.lower().split('illion')[0].split('llion')[0].split('лион')[0].split('лн')[0].rstrip('а').rstrip('ов')
-                if base_multiplier in self.multipliers:
-                    amount *= self.multipliers[base_multiplier]
-            except (ValueError, KeyError):
-                continue
-
-            self._add_if_valid_currency(results, amount, currency)
-
-        return results
-
-    def _try_parse_word_number_multiplier_currency(self, text: str) -> List[Tuple[float, str]]:
-        """Try to parse text as word number + multiplier + currency (e.g., 'два ляма рублей', 'три миллиона долларов')"""
-        results = []
-        sorted_numbers = sorted(WORD_NUMBERS.keys(), key=len, reverse=True)
-        sorted_multipliers = sorted(self.multipliers.keys(), key=len, reverse=True)
-
-        # Pattern matches: word number + multiplier + currency
-        pattern = r"(?i)(" + "|".join(map(re.escape, sorted_numbers)) + r")\s+(" + \
-                 "|".join(map(re.escape, sorted_multipliers)) + r")\s+([a-zA-Zа-яА-Я€$¥£₽₴кчКЧ]+)"
-
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            try:
-                number_word = match.group(1).lower()
-                multiplier_word = match.group(2).lower()
-                currency = match.group(3).lower()
-
-                # Calculate total amount
-                base_amount = WORD_NUMBERS[number_word]
-                amount = base_amount * self.multipliers[multiplier_word]
-
-                self._add_if_valid_currency(results, amount, currency)
-            except (KeyError, ValueError):
-                continue
-
-        return results
-
-    def _try_parse_multiplier_currency(self, text: str) -> List[Tuple[float, str]]:
-        """Try to parse text as multiplier word + currency (e.g., 'миллион рублей', 'тысяча долларов')"""
-        results = []
-        sorted_multipliers = sorted(self.multipliers.keys(), key=len, reverse=True)
-        pattern = r"(?i)(" + "|".join(map(re.escape, sorted_multipliers)) + r")\s+([a-zA-Zа-яА-Я€$¥£₽₴кчКЧ]+)"
 
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            multiplier_word = match.group(1).lower()
-            currency = match.group(2).lower()
-            amount = self.multipliers[multiplier_word]
+        for match in NUMBER_MULTIPLIER_CURRENCY_RE.finditer(text):
+            amount_str = match.group(1).replace(',', '')
+            amount = float(amount_str) * self.multipliers[match.group(2).lower()]
+            currency = match.group(3).lower()
             self._add_if_valid_currency(results, amount, currency)
 
         return results
 
-    def _try_parse_word_number_currency(self, text: str) -> List[Tuple[float, str]]:
-        """Try to parse text as word number + currency (e.g., 'two hundred dollars', 'двести рублей')"""
+    def _try_parse_spoken_amount(self, text: str) -> List[Tuple[float, str]]:
+        """
+        Try to parse text as a spelled out number + currency (e.g. 'two hundred fifty dollars',
+        'двести пятьдесят тысяч рублей', 'два ляма рублей'). One pass over the word tokens collects runs
+        of number words; the state machine in phrase_value composes each run ending right before a currency.
+        """
         results = []
-        sorted_numbers = sorted(WORD_NUMBERS.keys(), key=len, reverse=True)
-        pattern = r"(?i)(" + "|".join(map(re.escape, sorted_numbers)) + r")\s+([a-zA-Zа-яА-Я€$¥£₽₴кчКЧ]+)"
-
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            try:
-                number_word = match.group(1).lower()
-                amount = WORD_NUMBERS[number_word]
-                currency = match.group(2).lower()
-                self._add_if_valid_currency(results, amount, currency)
-            except (KeyError, ValueError):
-                continue
+        run = []
+        run_end = 0
+
+        for match in WORD_TOKEN_RE.finditer(text):
+            word = match.group().lower()
+            gap = text[run_end:match.start()]
+            if run and (gap == "-" or (gap and gap.isspace())):
+                # One number never spans lines, "million\nдвести €" is two amounts
+                if word in NUMBER_TOKENS and "\n" not in gap:
+                    run.append(word)
+                    run_end = match.end()
+                    continue
+                # Like the other grammars, the currency has to follow the amount after whitespace
+                if gap != "-":
+                    amount = phrase_value(" ".join(run))
+                    if amount is not None:
+                        self._add_if_valid_currency(results, amount, word)
+            run = [word] if word in NUMBER_TOKENS else []
+            run_end = match.end()
 
         return results
 
     def _try_parse_number_currency(self, text: str) -> List[Tuple[float, str]]:
         """Try to parse text as number + currency (e.g., '100 usd', '50 eur')"""
         results = []
-        pattern = r"(\d{1,3}(?:,\d{3})*(?:\.\d+)?|\d+(?:\.\d+)?)[.\s]*([a-zA-Zа-яА-Я€$¥£₽₴кчКЧ]+)"
 
-        for match in re.finditer(pattern, text, re.IGNORECASE):
+        for match in NUMBER_CURRENCY_RE.finditer(text):
             amount_str = match.group(1).replace(',', '')
             amount = float(amount_str)
             currency = match.group(2).lower()
@@ -128,7 +171,6 @@ class CurrencyParser:
 
     def _add_if_valid_currency(self, results: List[Tuple[float, str]], amount: float, currency: str):
         """Helper method to add amount and currency if the currency is valid"""
-        for alias, code in CURRENCY_ALIASES.items():
-            if currency.startswith(alias) or currency == alias:
-                results.append((amount, code))
-                break
+        code = ALIAS_INDEX.lookup(currency)
+        if code is not None:
+            results.append((amount, code))
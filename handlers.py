@@ -1,40 +1,63 @@
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import asyncio
+import logging
+from collections import OrderedDict
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
 from telegram.ext import ContextTypes
 from currencies_handler import CurrenciesHandler
 from reply_builder import ReplyBuilder
 from currency_parser import CurrencyParser
+from prefilter import CurrencyPrefilter
+from allowlist import Allowlist
 from rate_limiter import RateLimiter
 
+logger = logging.getLogger(__name__)
+
 class CurrencyMessageHandler:
     def __init__(self, currencies_handler: CurrenciesHandler, reply_builder: ReplyBuilder,
-                 allowed_user_ids: str, allowed_chat_ids: str):
+                 allowed_user_ids: str, allowed_chat_ids: str, rate_limiter=None, allowlist_file: str = None):
         self.currency_parser = CurrencyParser()
+        self.prefilter = CurrencyPrefilter()
         self.currencies_handler = currencies_handler
         self.reply_builder = reply_builder
-        self.allowed_user_ids = allowed_user_ids
-        self.allowed_chat_ids = allowed_chat_ids
-        self.rate_limiter = RateLimiter(limit=5, window=60)  # 5 requests per minute
+        # Parsed once into frozensets; allowlist_file, if given, can change them at runtime
+        self.allowlist = Allowlist(allowed_user_ids, allowed_chat_ids, allowlist_file)
+        # 5 requests per minute; webhook workers pass a SharedRateLimiter to enforce it across processes
+        self.rate_limiter = rate_limiter or RateLimiter(limit=5, window=60)
         self.max_values_per_message = 5  # Maximum number of currency values per message
+        self.inline_debounce = 0.3  # Seconds to wait for the next keystroke before answering an inline query
+        self.inline_cache_time = 60  # Seconds Telegram may cache our inline answers
+        self.inline_cache_size = 2048  # Ready-made inline results kept, keyed by (query, rates version)
+        self._inline_results = OrderedDict()
+        self._latest_inline_query = {}  # user_id -> id of the newest inline query being debounced
+        self.not_allowed = 0
+        self.rate_limited = 0
+        self.inline_cache_hits = 0
+        self.inline_cache_misses = 0
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle incoming messages with currency amounts"""
         # if chat is allowed, then we reply even if user is not in allowed users
-        if self.allowed_chat_ids:
-            chat_id_str = str(update.effective_chat.id)
-            if chat_id_str not in self.allowed_chat_ids.split(","):
-                print(f"Chat {chat_id_str} not in allowed chats, ignoring.")
-                return
+        user = update.effective_user
+        user_id = user.id if user else None
+        if not self.allowlist.is_allowed(user_id, update.effective_chat.id):
+            self.not_allowed += 1
+            logger.debug("Ignoring message: chat=%s user=%s not allowed", update.effective_chat.id, user_id)
+            return
 
         text = update.message.text
+        # Cheap keyword scan drops ordinary chatter before any parser grammar runs
+        if not self.prefilter.may_contain_currency(text):
+            return
+
         currency_pairs = self.currency_parser.parse(text)
         if not currency_pairs:
-            print("No amount or base currency detected")
+            logger.debug("No amount or base currency detected")
             return
 
         # Only check rate limit if we found currency pairs
-        user_id = update.effective_user.id
-        if not self.rate_limiter.is_allowed(user_id):
-            remaining_time = self.rate_limiter.get_remaining_time(user_id)
+        if not await self.rate_limiter.is_allowed_async(user_id):
+            self.rate_limited += 1
+            remaining_time = await self.rate_limiter.get_remaining_time_async(user_id)
             await update.message.reply_text(
                 f"⏳ Please wait {remaining_time} seconds before making another request.",
                 parse_mode="HTML"
@@ -45,14 +68,7 @@ class CurrencyMessageHandler:
         if len(currency_pairs) > self.max_values_per_message:
             currency_pairs = currency_pairs[:self.max_values_per_message]
 
-        all_replies = []
-        for amount, base in currency_pairs:
-            rates = self.currencies_handler.fetch_exchange_rates(base)
-            if not rates:
-                continue
-            result = self.currencies_handler.get_converted_amounts(amount, base)
-            reply = self.reply_builder.build_html(amount, base, result)
-            all_replies.append(reply)
+        all_replies = await self.build_replies(currency_pairs)
 
         if not all_replies:
             await update.message.reply_text("Could not fetch exchange rates.")
@@ -72,6 +88,123 @@ class CurrencyMessageHandler:
             reply_markup=reply_markup
         )
 
+    async def convert_pairs(self, currency_pairs: list) -> list:
+        """
+        Fetch rates for every distinct base concurrently and convert each pair
+        :return: (amount, base, converted amounts, rates version) for every pair whose rates could be fetched
+        """
+        bases = list(dict.fromkeys(base for _, base in currency_pairs))
+        fetched = await asyncio.gather(*(self._fetch_versioned(base) for base in bases), return_exceptions=True)
+
+        rates_by_base = {}
+        for base, rates in zip(bases, fetched):
+            if isinstance(rates, Exception):
+                logger.warning("Could not fetch %s rates: %r", base, rates)
+                continue
+            rates_by_base[base] = rates
+
+        conversions = []
+        for amount, base in currency_pairs:
+            if base not in rates_by_base:
+                continue
+            rates, version = rates_by_base[base]
+            if not rates:
+                continue
+            converted = self.currencies_handler.get_converted_amounts(amount, base, rates)
+            conversions.append((amount, base, converted, version))
+        return conversions
+
+    async def _fetch_versioned(self, base: str) -> tuple:
+        """
+        Rates for base and the rates version they belong to. Read as soon as the fetch returns: stale rates
+        come back without suspending, so a refresh finishing later in the gather cannot claim them.
+        """
+        rates = await self.currencies_handler.fetch_exchange_rates_async(base)
+        return rates, self.currencies_handler.rates_version
+
+    async def build_replies(self, currency_pairs: list) -> list:
+        """Build one HTML reply per (amount, base) pair"""
+        conversions = await self.convert_pairs(currency_pairs)
+        return [self.reply_builder.build_html(amount, base, result, version)
+                for amount, base, result, version in conversions]
+
+    async def handle_inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle inline queries such as "@bot 100 usd", which arrive on every keystroke"""
+        inline_query = update.inline_query
+        # Inline queries have no chat, only the user allowlist applies
+        if not self.allowlist.is_allowed(inline_query.from_user.id):
+            return
+        query = " ".join(inline_query.query.lower().split())
+        if not query:
+            return
+
+        # Cache hit: answer right away, no debounce, parsing or rendering
+        key = (query, self.currencies_handler.rates_version)
+        results = self._inline_results.get(key)
+        if results is not None:
+            self.inline_cache_hits += 1
+            self._inline_results.move_to_end(key)
+            await inline_query.answer(results, cache_time=self.inline_cache_time)
+            return
+
+        # Debounce per user: when a newer keystroke arrives meanwhile, this query is dropped unanswered
+        user_id = inline_query.from_user.id
+        self._latest_inline_query[user_id] = inline_query.id
+        await asyncio.sleep(self.inline_debounce)
+        if self._latest_inline_query.get(user_id) != inline_query.id:
+            return
+        del self._latest_inline_query[user_id]
+        self.inline_cache_misses += 1
+
+        results, version = await self.build_inline_results(query)
+        # Keyed by the oldest version an article was built from: when a stale base was refreshed meanwhile,
+        # lookups under the current version miss and rebuild. Answers missing a base whose rates could
+        # not be fetched are not cached, the next keystroke tries again.
+        if version is not None:
+            self._inline_results[(query, version)] = results
+            if len(self._inline_results) > self.inline_cache_size:
+                self._inline_results.popitem(last=False)
+        await inline_query.answer(results, cache_time=self.inline_cache_time)
+
+    async def build_inline_results(self, query: str) -> tuple:
+        """
+        One inline article per currency amount found in query
+        :return: (articles, oldest rates version they were built from, or None if an amount was left out
+                  because its rates could not be fetched)
+        """
+        if not self.prefilter.may_contain_currency(query):
+            return [], self.currencies_handler.rates_version
+        currency_pairs = self.currency_parser.parse(query)[:self.max_values_per_message]
+        if not currency_pairs:
+            return [], self.currencies_handler.rates_version
+
+        results = []
+        conversions = await self.convert_pairs(currency_pairs)
+        for index, (amount, base, result, version) in enumerate(conversions):
+            title, description = self.reply_builder.build_summary(amount, base, result)
+            results.append(InlineQueryResultArticle(
+                id=str(index),
+                title=title,
+                description=description,
+                input_message_content=InputTextMessageContent(
+                    self.reply_builder.build_html(amount, base, result, version),
+                    parse_mode="HTML",
+                    disable_web_page_preview=True
+                )
+            ))
+        if len(conversions) < len(currency_pairs):
+            return results, None
+        return results, min(version for _, _, _, version in conversions)
+
+    def get_stats(self) -> dict:
+        """Messages dropped by the allowlist or rate limiter, and inline answer cache counters"""
+        return {
+            "not_allowed": self.not_allowed,
+            "rate_limited": self.rate_limited,
+            "inline_cache_hits": self.inline_cache_hits,
+            "inline_cache_misses": self.inline_cache_misses,
+        }
+
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle button callbacks"""
         query = update.callback_query
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a few microseconds (parser strategies) up to slow upstream requests
+DEFAULT_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        # One slot per bound plus +Inf; cumulated only when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Process-wide histograms plus the counters components already keep in get_stats().
+        Hot paths check `enabled` before reading the clock, so a disabled registry costs one attribute read.
+        """
+        self.enabled = False
+        # Added to every sample, e.g. {"worker": "1"} when several processes serve the bot
+        self.const_labels = {}
+        self._histograms = {}  # name -> (description, {labels: Histogram})
+        self._collectors = []  # (prefix, description, get_stats)
+        self._dump_task = None
+
+    def enable(self):
+        self.enabled = True
+
+    def histogram(self, name: str, description: str, **labels) -> Histogram:
+        """Histogram for name and labels, created on first use; call at import time, not per event"""
+        _, series = self._histograms.setdefault(name, (description, {}))
+        key = tuple(sorted(labels.items()))
+        if key not in series:
+            series[key] = Histogram()
+        return series[key]
+
+    def register(self, prefix: str, get_stats, description: str = ""):
+        """Expose every numeric value of get_stats() as {prefix}_{key}, read only when metrics are rendered"""
+        self._collectors.append((prefix, description, get_stats))
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for prefix, description, get_stats in self._collectors:
+            for key, value in get_stats().items():
+                if isinstance(value, (int, float)):
+                    name = f"{prefix}_{key}"
+                    lines.append(f"# HELP {name} {description or prefix}")
+                    lines.append(f"# TYPE {name} untyped")
+                    lines.append(f"{name}{_format_labels(self.const_labels)} {float(value)}")
+
+        for name, (description, series) in self._histograms.items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in series.items():
+                labels = {**self.const_labels, **dict(key)}
+                cumulative = 0
+                for bound, count in zip((*histogram.bounds, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """Compact view for logs: stats values, and count and mean of every histogram"""
+        values = {}
+        for prefix, _, get_stats in self._collectors:
+            for key, value in get_stats().items():
+                if isinstance(value, (int, float)):
+                    values[f"{prefix}_{key}"] = value
+        for name, (_, series) in self._histograms.items():
+            for key, histogram in series.items():
+                if histogram.count:
+                    values[name + _format_labels(dict(key))] = {
+                        "count": histogram.count, "mean": histogram.sum / histogram.count}
+        return values
+
+    def start_periodic_dump(self, interval: float):
+        """Log a snapshot every interval seconds on the running event loop"""
+        if self._dump_task is None or self._dump_task.done():
+            self._dump_task = asyncio.ensure_future(self._dump_loop(interval))
+
+    async def _dump_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            logger.info("metrics %s", json.dumps(self.snapshot(), ensure_ascii=False))
+
+    def stop_periodic_dump(self):
+        if self._dump_task is not None:
+            self._dump_task.cancel()
+            self._dump_task = None
+
+
+METRICS = MetricsRegistry()
@@ -0,0 +1,93 @@
+from collections import deque
+from functools import lru_cache
+from aliases import CURRENCY_ALIASES
+from word_numbers import AMOUNT_WORDS
+from currency_parser import MULTIPLIERS
+
+# Bit flags a keyword contributes once it has been seen in the text
+CURRENCY_FLAG = 1
+AMOUNT_FLAG = 2
+ALL_FLAGS = CURRENCY_FLAG | AMOUNT_FLAG
+
+
+@lru_cache(maxsize=1)
+def _default_automaton():
+    """Built on first use and shared by every prefilter in the process; it is never mutated"""
+    # Keywords are casefolded so the check stays at least as permissive as the
+    # parser's IGNORECASE grammars and lower-cased alias lookup
+    keywords = {}
+    for alias in CURRENCY_ALIASES:
+        keywords[alias.casefold()] = keywords.get(alias.casefold(), 0) | CURRENCY_FLAG
+    for word in AMOUNT_WORDS + list(MULTIPLIERS):
+        keywords[word.casefold()] = keywords.get(word.casefold(), 0) | AMOUNT_FLAG
+    return CurrencyPrefilter._build_automaton(keywords)
+
+
+class CurrencyPrefilter:
+    def __init__(self):
+        """
+        Aho-Corasick automaton over currency aliases, number words and multipliers.
+        Every parser strategy needs an amount (a digit, a number word or a multiplier)
+        and a token starting with a currency alias, so a message missing either one
+        can be rejected without running the parser.
+        """
+        self.transitions, self.outputs = _default_automaton()
+        self.passed = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _build_automaton(keywords: dict):
+        """Build a DFA that only stores transitions leading away from the root state"""
+        goto = [{}]
+        outputs = [0]
+        for keyword, flags in keywords.items():
+            state = 0
+            for ch in keyword:
+                if ch not in goto[state]:
+                    goto.append({})
+                    outputs.append(0)
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            outputs[state] |= flags
+
+        # Breadth-first pass resolving failure links into direct transitions
+        fail = [0] * len(goto)
+        transitions = [dict(goto[0])]
+        transitions.extend({} for _ in range(len(goto) - 1))
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            # Inherit the failure state's moves, then override with our own edges
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            for ch, child in goto[state].items():
+                fail[child] = transitions[fail[state]].get(ch, 0)
+                queue.append(child)
+        return transitions, outputs
+
+    def may_contain_currency(self, text: str) -> bool:
+        """Return False only if the parser is guaranteed to find nothing in text"""
+        transitions = self.transitions
+        outputs = self.outputs
+        state = 0
+        found = 0
+        for ch in text.casefold():
+            state = transitions[state].get(ch, 0)
+            if state:
+                found |= outputs[state]
+            elif ch.isdecimal():
+                found |= AMOUNT_FLAG
+            if found == ALL_FLAGS:
+                self.passed += 1
+                return True
+        self.rejected += 1
+        return False
+
+    def get_stats(self) -> dict:
+        """Prefilter hit/miss counters; every rejected message is a parse() call saved"""
+        total = self.passed + self.rejected
+        return {
+            "passed": self.passed,
+            "rejected": self.rejected,
+            "rejected_ratio": self.rejected / total if total else 0.0,
+        }
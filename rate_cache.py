@@ -0,0 +1,157 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+from collections.abc import MutableMapping
+from datetime import datetime, timezone
+
+BINARY_MAGIC = b"RCACHE1\0"
+# magic, fetch time as POSIX seconds, number of base rows, number of target codes, size of the code table
+_HEADER = struct.Struct("<8sdIII")
+_INDEX = struct.Struct("<I")
+
+CACHE_FORMATS = ("json", "binary")
+# Default file name per format, so tools reading rates_cache.json as JSON never find a binary blob there
+CACHE_FILES = {"json": "rates_cache.json", "binary": "rates_cache.bin"}
+
+
+class MappedRates(MutableMapping):
+    def __init__(self, buffer, bases: list, codes: list, offset: int):
+        """
+        Base -> {code: rate} view over a memory-mapped binary cache. Rows are decoded on first
+        access, so loading costs only the header no matter how many currencies are cached.
+        :param buffer: Mapped file contents
+        :param bases: Base currency of every row, in file order
+        :param codes: Target currency of every column, in file order
+        :param offset: Byte offset of the first row
+        """
+        self._buffer = buffer
+        self._rows = {base: index for index, base in enumerate(bases)}
+        self._codes = codes
+        self._offset = offset
+        self._row = struct.Struct(f"<{len(codes)}d")
+        self._decoded = {}
+
+    def __getitem__(self, base: str) -> dict:
+        if base in self._decoded:
+            return self._decoded[base]
+        index = self._rows[base]
+        values = self._row.unpack_from(self._buffer, self._offset + index * self._row.size)
+        # Missing rates are stored as NaN, the only value not equal to itself
+        row = {code: value for code, value in zip(self._codes, values) if value == value}
+        self._decoded[base] = row
+        return row
+
+    def __setitem__(self, base: str, rates: dict):
+        self._decoded[base] = rates
+
+    def __delitem__(self, base: str):
+        found = self._rows.pop(base, None) is not None
+        found = self._decoded.pop(base, None) is not None or found
+        if not found:
+            raise KeyError(base)
+
+    def __iter__(self):
+        yield from self._rows
+        for base in self._decoded:
+            if base not in self._rows:
+                yield base
+
+    def __len__(self) -> int:
+        return len(self._rows) + sum(1 for base in self._decoded if base not in self._rows)
+
+
+class RateCacheStore:
+    def __init__(self, path: str, cache_format: str = "json", legacy_path: str = None):
+        """
+        Atomic persistence for the rates cache
+        :param path: Cache file path
+        :param cache_format: "json" or "binary" for writing; both formats are always readable
+        :param legacy_path: Cache file written under an older name, read while path does not exist yet
+        """
+        if cache_format not in CACHE_FORMATS:
+            raise ValueError(f"Unknown cache format {cache_format!r}, expected one of {CACHE_FORMATS}")
+        self.path = path
+        self.cache_format = cache_format
+        self.legacy_path = legacy_path
+
+    def load(self):
+        """
+        Read the cache file
+        :return: (fetch time as naive UTC datetime, rates per base)
+        :raises FileNotFoundError, KeyError, ValueError: if there is no usable cache
+        """
+        path = self.path
+        if self.legacy_path and not os.path.exists(path):
+            # Migration: the first save writes path, after which the legacy file is never read again
+            path = self.legacy_path
+        with open(path, "rb") as f:
+            if f.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+                return self._load_binary(f)
+            f.seek(0)
+            data = json.load(f)
+        return datetime.fromisoformat(data["timestamp"]), data["rates"]
+
+    def _load_binary(self, f):
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            _, timestamp, base_count, code_count, table_size = _HEADER.unpack_from(buffer, 0)
+            offset = _HEADER.size
+            table = bytes(buffer[offset:offset + table_size]).decode("utf-8")
+            codes = table.split(",") if table else []
+            offset += table_size
+            bases = []
+            for _ in range(base_count):
+                bases.append(codes[_INDEX.unpack_from(buffer, offset)[0]])
+                offset += _INDEX.size
+        except (struct.error, IndexError) as e:
+            raise ValueError(f"Corrupt binary rate cache: {e}") from e
+        if len(codes) != code_count or len(buffer) < offset + base_count * code_count * 8:
+            raise ValueError("Truncated binary rate cache")
+
+        fetched_at = datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+        return fetched_at, MappedRates(buffer, bases, codes, offset)
+
+    def save(self, fetched_at: datetime, rates: dict):
+        """Write the cache to a temporary file and rename it over the old one, so readers never see a partial file"""
+        if self.cache_format == "binary":
+            payload = self._encode_binary(fetched_at, rates)
+        else:
+            payload = json.dumps(
+                {"timestamp": fetched_at.isoformat(), "rates": dict(rates)}, separators=(",", ":")
+            ).encode("utf-8")
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".rates-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    @staticmethod
+    def _encode_binary(fetched_at: datetime, rates: dict) -> bytes:
+        # Every base must also be a column so rows can refer to it through the code table
+        codes = list(dict.fromkeys([*rates, *(code for row in rates.values() for code in row)]))
+        columns = {code: index for index, code in enumerate(codes)}
+        table = ",".join(codes).encode("utf-8")
+        timestamp = fetched_at.replace(tzinfo=timezone.utc).timestamp()
+
+        parts = [_HEADER.pack(BINARY_MAGIC, timestamp, len(rates), len(codes), len(table)), table]
+        parts.extend(_INDEX.pack(columns[base]) for base in rates)
+        nan = float("nan")
+        row = struct.Struct(f"<{len(codes)}d")
+        for base_rates in rates.values():
+            values = [nan] * len(codes)
+            for code, value in base_rates.items():
+                values[columns[code]] = value
+            parts.append(row.pack(*values))
+        return b"".join(parts)
@@ -0,0 +1,155 @@
+import sqlite3
+import struct
+import threading
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+# One (currency id, rate) pair inside a snapshot blob
+_ENTRY = struct.Struct("<Hd")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS currencies (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    base INTEGER NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    rates BLOB NOT NULL,
+    PRIMARY KEY (base, fetched_at)
+) WITHOUT ROWID;
+"""
+
+
+def _to_epoch(moment: datetime) -> int:
+    # Naive datetimes are UTC, like CurrenciesHandler.last_fetched_time
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def _from_epoch(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+
+class RateHistory:
+    def __init__(self, path: str):
+        """
+        Append-only store of rate snapshots, clustered on (base, fetched_at) so lookups by time are O(log n)
+        :param path: SQLite database file, ":memory:" for a throwaway store
+        """
+        self.path = path
+        # Appends may come from a worker thread while lookups run on the event loop
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._load_currency_ids()
+
+    def _load_currency_ids(self):
+        self._ids = {code: id_ for id_, code in self._conn.execute("SELECT id, code FROM currencies")}
+        self._codes = {id_: code for code, id_ in self._ids.items()}
+
+    def _currency_id(self, code: str) -> int:
+        if code not in self._ids:
+            # Other processes may share the file and have inserted the code since our ids were loaded
+            self._conn.execute("INSERT OR IGNORE INTO currencies (code) VALUES (?)", (code,))
+            id_ = self._conn.execute("SELECT id FROM currencies WHERE code = ?", (code,)).fetchone()[0]
+            self._ids[code] = id_
+            self._codes[id_] = code
+        return self._ids[code]
+
+    def _known_id(self, code: str) -> Optional[int]:
+        """Id of code for lookups, None if no process has recorded it yet"""
+        if code not in self._ids:
+            with self._lock:
+                self._load_currency_ids()
+        return self._ids.get(code)
+
+    def _encode(self, rates: dict) -> bytes:
+        return b"".join(_ENTRY.pack(self._currency_id(code), value) for code, value in rates.items())
+
+    def _decode(self, blob: bytes) -> dict:
+        try:
+            return {self._codes[id_]: value for id_, value in _ENTRY.iter_unpack(blob)}
+        except KeyError:
+            # Written by another process with an id inserted after ours were loaded
+            with self._lock:
+                self._load_currency_ids()
+            return {self._codes[id_]: value for id_, value in _ENTRY.iter_unpack(blob)}
+
+    def append(self, base: str, fetched_at: datetime, rates: dict):
+        """Record the rates fetched for base at fetched_at; a second snapshot for the same second replaces the first"""
+        self.extend([(base, fetched_at, rates)])
+
+    def extend(self, snapshots: Iterable[Tuple[str, datetime, dict]]):
+        """Record many (base, fetched_at, rates) snapshots in one transaction, e.g. for backfills"""
+        with self._lock:
+            try:
+                with self._conn:
+                    # Encoded up front: new currency ids are inserted while encoding
+                    rows = [(self._currency_id(base), _to_epoch(fetched_at), self._encode(rates))
+                            for base, fetched_at, rates in snapshots]
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO snapshots (base, fetched_at, rates) VALUES (?, ?, ?)", rows)
+            except BaseException:
+                # Ids handed out inside the rolled back transaction are gone
+                self._load_currency_ids()
+                raise
+
+    def nearest(self, base: str, moment: datetime) -> Optional[Tuple[datetime, dict]]:
+        """
+        Find the snapshot closest in time to moment
+        :return: (fetched_at, rates) or None if base has no history
+        """
+        base_id = self._known_id(base)
+        if base_id is None:
+            return None
+        target = _to_epoch(moment)
+        with self._lock:
+            # Two seeks on the primary key: the last snapshot at or before target and the first after it
+            before = self._conn.execute(
+                "SELECT fetched_at, rates FROM snapshots WHERE base = ? AND fetched_at <= ? "
+                "ORDER BY fetched_at DESC LIMIT 1", (base_id, target)).fetchone()
+            after = self._conn.execute(
+                "SELECT fetched_at, rates FROM snapshots WHERE base = ? AND fetched_at > ? "
+                "ORDER BY fetched_at LIMIT 1", (base_id, target)).fetchone()
+        candidates = [row for row in (before, after) if row is not None]
+        if not candidates:
+            return None
+        fetched_at, blob = min(candidates, key=lambda row: abs(row[0] - target))
+        return _from_epoch(fetched_at), self._decode(blob)
+
+    def between(self, base: str, start: datetime, end: datetime) -> List[Tuple[datetime, dict]]:
+        """All snapshots for base with start <= fetched_at <= end, oldest first"""
+        base_id = self._known_id(base)
+        if base_id is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fetched_at, rates FROM snapshots WHERE base = ? AND fetched_at BETWEEN ? AND ? "
+                "ORDER BY fetched_at", (base_id, _to_epoch(start), _to_epoch(end))).fetchall()
+        return [(_from_epoch(fetched_at), self._decode(blob)) for fetched_at, blob in rows]
+
+    def summarize(self, base: str, code: str, start: datetime, end: datetime) -> Optional[dict]:
+        """
+        Trend of one rate over a period
+        :return: first/last/min/max/mean rate and change in percent, None if there is no data
+        """
+        values = [rates[code] for _, rates in self.between(base, start, end) if code in rates]
+        if not values:
+            return None
+        return {
+            "count": len(values),
+            "first": values[0],
+            "last": values[-1],
+            "min": min(values),
+            "max": max(values),
+            "mean": sum(values) / len(values),
+            "change_percent": (values[-1] - values[0]) / values[0] * 100 if values[0] else None,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
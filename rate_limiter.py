@@ -1,16 +1,20 @@
-from datetime import datetime, timedelta
-from collections import defaultdict
+import time
+from collections import OrderedDict
 
 class RateLimiter:
-    def __init__(self, limit: int = 5, window: int = 60):
+    def __init__(self, limit: int = 5, window: int = 60, clock=time.monotonic):
         """
         Initialize rate limiter
         :param limit: Maximum number of requests allowed in the time window
         :param window: Time window in seconds
+        :param clock: Monotonic time source in seconds
         """
         self.limit = limit
         self.window = window
-        self.user_requests = defaultdict(list)
+        self.clock = clock
+        # user_id -> ring buffer of the last `limit` request times, slot 0 holds the index of the oldest.
+        # Ordered by most recent allowed request, so idle users collect at the front.
+        self.user_requests = OrderedDict()
 
     def is_allowed(self, user_id: int) -> bool:
         """
@@ -18,32 +22,52 @@ class RateLimiter:
         :param user_id: Telegram user ID
         :return: True if request is allowed, False otherwise
         """
-        now = datetime.now()
-        user_times = self.user_requests[user_id]
+        now = self.clock()
+        self._evict_idle(now)
 
-        # Remove old requests
-        user_times = [time for time in user_times if now - time < timedelta(seconds=self.window)]
-        self.user_requests[user_id] = user_times
+        ring = self.user_requests.get(user_id)
+        if ring is None:
+            ring = [1] + [float("-inf")] * self.limit
+            self.user_requests[user_id] = ring
 
-        # Check if user has exceeded limit
-        if len(user_times) >= self.limit:
+        # Check if user has exceeded limit: the oldest of the last `limit` requests is still in the window
+        oldest = ring[0]
+        if now - ring[oldest] < self.window:
             return False
 
-        # Add new request
-        user_times.append(now)
+        # Add new request, overwriting the oldest one
+        ring[oldest] = now
+        ring[0] = oldest % self.limit + 1
+        self.user_requests.move_to_end(user_id)
         return True
 
+    async def is_allowed_async(self, user_id: int) -> bool:
+        """Same as is_allowed, for callers that also work with SharedRateLimiter"""
+        return self.is_allowed(user_id)
+
+    def _evict_idle(self, now: float):
+        """Drop users whose newest request has left the window, their state equals a fresh user's"""
+        user_requests = self.user_requests
+        while user_requests:
+            user_id, ring = next(iter(user_requests.items()))
+            newest = ring[(ring[0] - 2) % self.limit + 1]
+            if now - newest < self.window:
+                break
+            del user_requests[user_id]
+
     def get_remaining_time(self, user_id: int) -> int:
         """
         Get remaining time until next request is allowed
         :param user_id: Telegram user ID
         :return: Time in seconds until next request is allowed, 0 if requests are allowed
         """
-        if len(self.user_requests[user_id]) < self.limit:
+        ring = self.user_requests.get(user_id)
+        if ring is None:
             return 0
 
-        now = datetime.now()
-        oldest_request = min(self.user_requests[user_id])
-        time_passed = (now - oldest_request).total_seconds()
+        time_passed = self.clock() - ring[ring[0]]
+        return int(max(0.0, self.window - time_passed))
 
-        return max(0, int(self.window - time_passed))
+    async def get_remaining_time_async(self, user_id: int) -> int:
+        """Same as get_remaining_time, for callers that also work with SharedRateLimiter"""
+        return self.get_remaining_time(user_id)
@@ -1,27 +1,113 @@
-from ast import Dict
 import html
+from collections import OrderedDict
+from time import perf_counter
 from aliases import CURRENCY_EMOJIS
+from metrics import METRICS
+
+_RENDER_SECONDS = METRICS.histogram("reply_render_seconds", "Time to render a reply that was not memoized")
+
+
+def _format_number(value: float) -> str:
+    return f"{value:,.2f}".rstrip('0').rstrip('.')
 
 
 class ReplyBuilder:
+    def __init__(self, cache_size: int = 1024):
+        """
+        :param cache_size: Number of whole replies kept in the LRU, keyed by (amount, base, rates version)
+        """
+        # Escaped markup around each converted amount, built once instead of per reply line
+        self._line_parts = {code: self._build_line_parts(code) for code in CURRENCY_EMOJIS}
+        self._currency_order = sorted(CURRENCY_EMOJIS)
+        self.cache_size = cache_size
+        self._replies = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
     def _emoji_for(self, iso: str) -> str:
         return CURRENCY_EMOJIS.get(iso.upper(), iso.upper())
 
-    def build_html(self, amount: float, base: str, rates: dict) -> str:
-        formatted_amount = f"{amount:,.2f}".rstrip('0').rstrip('.')
-        safe_amount = html.escape(formatted_amount)
-        header = f"<b>{safe_amount} {html.escape(base)}</b>:\n"
+    def _build_line_parts(self, currency: str):
+        emoji = html.escape(self._emoji_for(currency))
+        return f"{emoji} <b>", f"</b> <code>{html.escape(currency)}</code>"
 
-        lines = []
-        for currency, rate in sorted(rates.items()):
+    def _sorted_currencies(self, rates: dict) -> list:
+        # Known currencies come out of the precomputed order; anything else needs a real sort
+        if rates.keys() <= self._line_parts.keys():
+            return [currency for currency in self._currency_order if currency in rates]
+        return sorted(rates)
+
+    def build_html(self, amount: float, base: str, rates: dict, version=None) -> str:
+        """
+        Render a conversion reply
+        :param amount: Amount in the base currency
+        :param base: Base currency code
+        :param rates: Converted amounts per target currency
+        :param version: Rates snapshot version the amounts were converted with; replies are memoized only if given
+        """
+        if version is not None:
+            key = (amount, base, version)
+            reply = self._replies.get(key)
+            if reply is not None:
+                self.cache_hits += 1
+                self._replies.move_to_end(key)
+                return reply
+            self.cache_misses += 1
+
+        if METRICS.enabled:
+            start = perf_counter()
+            reply = self._render(amount, base, rates)
+            _RENDER_SECONDS.observe(perf_counter() - start)
+        else:
+            reply = self._render(amount, base, rates)
+
+        if version is not None:
+            self._replies[key] = reply
+            if len(self._replies) > self.cache_size:
+                self._replies.popitem(last=False)
+        return reply
+
+    def get_stats(self) -> dict:
+        """Reply memo counters"""
+        return {
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cached_replies": len(self._replies),
+        }
+
+    def build_summary(self, amount: float, base: str, rates: dict):
+        """
+        Plain-text title and one-line description, e.g. for inline query results
+        :return: ("100 USD", "90 EUR · 80 GBP · ...")
+        """
+        title = f"{_format_number(amount)} {base}"
+        parts = []
+        for currency in self._sorted_currencies(rates):
             if currency.upper() == base.upper():
                 continue
             try:
-                formatted_converted = f"{float(rate):,.2f}".rstrip('0').rstrip('.')
-            except Exception:
+                parts.append(f"{_format_number(float(rates[currency]))} {currency}")
+            except (TypeError, ValueError):
+                continue
+        return title, " · ".join(parts)
+
+    def _render(self, amount: float, base: str, rates: dict) -> str:
+        header = f"<b>{html.escape(_format_number(amount))} {html.escape(base)}</b>:\n"
+
+        lines = []
+        base_upper = base.upper()
+        for currency in self._sorted_currencies(rates):
+            if currency.upper() == base_upper:
+                continue
+            try:
+                formatted_converted = _format_number(float(rates[currency]))
+            except (TypeError, ValueError):
                 continue
-            emoji = html.escape(self._emoji_for(currency))
-            lines.append(f"{emoji} <b>{formatted_converted}</b> <code>{html.escape(currency)}</code>")
+            parts = self._line_parts.get(currency)
+            if parts is None:
+                parts = self._build_line_parts(currency)
+            prefix, suffix = parts
+            lines.append(prefix + formatted_converted + suffix)
 
         body = "\n".join(lines) if lines else "<i>No supported target currencies returned.</i>"
         return header + body
@@ -0,0 +1,94 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    user_id INTEGER NOT NULL,
+    requested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS requests_by_user ON requests (user_id, requested_at);
+"""
+
+class SharedRateLimiter:
+    def __init__(self, path: str, limit: int = 5, window: int = 60, clock=time.time):
+        """
+        Sliding-window rate limiter like RateLimiter, but its state lives in a SQLite file so
+        several worker processes enforce one limit per user together
+        :param path: SQLite database file shared by all workers
+        :param limit: Maximum number of requests allowed in the time window
+        :param window: Time window in seconds
+        :param clock: Time source in seconds, must agree between processes
+        """
+        self.limit = limit
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._last_sweep = float("-inf")
+
+    def is_allowed(self, user_id: int) -> bool:
+        """
+        Check if user is allowed to make a request
+        :param user_id: Telegram user ID
+        :return: True if request is allowed, False otherwise
+        """
+        now = self.clock()
+        cutoff = now - self.window
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so count and insert are atomic across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if now - self._last_sweep >= self.window:
+                    # Idle users: every request of theirs has left the window
+                    self._conn.execute("DELETE FROM requests WHERE requested_at <= ?", (cutoff,))
+                    self._last_sweep = now
+                else:
+                    self._conn.execute("DELETE FROM requests WHERE user_id = ? AND requested_at <= ?",
+                                       (user_id, cutoff))
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM requests WHERE user_id = ?",
+                                              (user_id,)).fetchone()
+                allowed = count < self.limit
+                if allowed:
+                    self._conn.execute("INSERT INTO requests (user_id, requested_at) VALUES (?, ?)", (user_id, now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return allowed
+
+    async def is_allowed_async(self, user_id: int) -> bool:
+        """
+        is_allowed in a worker thread: BEGIN IMMEDIATE waits up to the busy timeout while another worker
+        holds the write lock, and that wait must not stall every other update of this process
+        """
+        return await asyncio.to_thread(self.is_allowed, user_id)
+
+    def get_remaining_time(self, user_id: int) -> int:
+        """
+        Get remaining time until next request is allowed
+        :param user_id: Telegram user ID
+        :return: Time in seconds until next request is allowed, 0 if requests are allowed
+        """
+        now = self.clock()
+        with self._lock:
+            # The oldest of the last `limit` requests has to leave the window first
+            rows = self._conn.execute(
+                "SELECT requested_at FROM requests WHERE user_id = ? AND requested_at > ? "
+                "ORDER BY requested_at DESC LIMIT ?", (user_id, now - self.window, self.limit)).fetchall()
+        if len(rows) < self.limit:
+            return 0
+        return int(max(0.0, self.window - (now - rows[-1][0])))
+
+    async def get_remaining_time_async(self, user_id: int) -> int:
+        """get_remaining_time in a worker thread, see is_allowed_async"""
+        return await asyncio.to_thread(self.get_remaining_time, user_id)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+
+# Modules live at the repository root, next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aliases import CURRENCIES
+from currencies_handler import CurrenciesHandler
+from handlers import CurrencyMessageHandler
+from reply_builder import ReplyBuilder
+from benchmarks.stub_upstream import StubUpstream
+
+
+@pytest.fixture
+def upstream():
+    stub = StubUpstream()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def make_handler(upstream, tmp_path):
+    """
+    Factory for a message handler whose CurrenciesHandler talks to the stub upstream and caches under tmp_path.
+    Call it inside the event loop the handler will run on; keyword arguments go to CurrenciesHandler.
+    """
+    def make(**kwargs) -> CurrencyMessageHandler:
+        currencies_handler = CurrenciesHandler(upstream.url, CURRENCIES, "test",
+                                               cache_file=str(tmp_path / "rates_cache.json"), **kwargs)
+        return CurrencyMessageHandler(currencies_handler, ReplyBuilder(), "", "")
+    return make
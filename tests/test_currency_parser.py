@@ -0,0 +1,19 @@
+import pytest
+from currency_parser import CurrencyParser
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 billion usd", [(2000000000, "USD")]),
+    ("5 millions usd", [(5000000, "USD")]),
+    ("2 миллиарда рублей", [(2000000000, "RUB")]),
+    ("5 тысяч долларов", [(5000, "USD")]),
+    ("2 тысячи долларов", [(2000, "USD")]),
+    ("1.5 тысячи евро", [(1500, "EUR")]),
+    ("2 ляма рублей", [(2000000, "RUB")]),
+    ("10 тыс. рублей", [(10000, "RUB")]),
+    ("100k usd", [(100000, "USD")]),
+    ("1.5m eur", [(1500000, "EUR")]),
+    ("5 млион рублей", [(5000000, "RUB")]),
+])
+def test_digits_followed_by_a_scale_word(text, expected):
+    assert CurrencyParser().parse(text) == expected
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from rate_cache import RateCacheStore
+from benchmarks.stub_upstream import StubUpstream
+
+
+def inline_update(query: str, query_id: str, answers: list):
+    async def answer(results, **kwargs):
+        answers.append(results)
+
+    inline_query = SimpleNamespace(id=query_id, query=query, from_user=SimpleNamespace(id=1), answer=answer)
+    return SimpleNamespace(inline_query=inline_query)
+
+
+def test_answer_is_not_cached_when_rates_could_not_be_fetched(upstream, make_handler):
+    upstream.close()
+
+    async def scenario():
+        handler = make_handler(max_retries=0)
+        currencies_handler = handler.currencies_handler
+        handler.inline_debounce = 0
+        answers = []
+        try:
+            await handler.handle_inline_query(inline_update("100 usd", "1", answers), None)
+            # Upstream is back: the same query must be built again, not answered from the empty result
+            restarted = StubUpstream()
+            currencies_handler.api_url = restarted.url
+            try:
+                await handler.handle_inline_query(inline_update("100 usd", "2", answers), None)
+            finally:
+                restarted.close()
+        finally:
+            await currencies_handler.aclose()
+        return handler, answers
+
+    handler, answers = asyncio.run(scenario())
+
+    assert answers[0] == []
+    assert len(answers[1]) == 1
+    assert handler.inline_cache_hits == 0
+    assert handler.inline_cache_misses == 2
+
+
+def test_stale_answer_is_not_cached_under_a_newer_version(make_handler, tmp_path):
+    fetched_at = datetime.utcnow() - timedelta(seconds=3600 + 10)
+    RateCacheStore(str(tmp_path / "rates_cache.json")).save(fetched_at, {"USD": {"EUR": 0.5}})
+
+    async def scenario():
+        handler = make_handler()
+        currencies_handler = handler.currencies_handler
+        handler.inline_debounce = 0
+        request = currencies_handler._request_rates_async
+
+        async def slow_eur(base):
+            # The stale USD article's background refresh lands while the query still waits for EUR
+            if base == "EUR":
+                await asyncio.sleep(0.3)
+            return await request(base)
+
+        currencies_handler._request_rates_async = slow_eur
+        answers = []
+        try:
+            await handler.handle_inline_query(inline_update("100 usd 1 eur", "1", answers), None)
+            await handler.handle_inline_query(inline_update("100 usd 1 eur", "2", answers), None)
+        finally:
+            await currencies_handler.aclose()
+        return handler, answers
+
+    handler, answers = asyncio.run(scenario())
+
+    assert "<b>50</b>" in answers[0][0].input_message_content.message_text
+    assert "<b>92</b>" in answers[1][0].input_message_content.message_text
+    assert handler.inline_cache_hits == 0
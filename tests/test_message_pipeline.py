@@ -0,0 +1,70 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+import pytest
+from rate_cache import RateCacheStore
+
+LATENCY = 0.3
+
+
+@pytest.fixture
+def upstream(upstream):
+    upstream.latency = LATENCY
+    return upstream
+
+
+def test_distinct_bases_are_fetched_concurrently(upstream, make_handler):
+    pairs = [(100, "USD"), (5, "EUR"), (7, "GBP"), (1000, "JPY"), (20, "CZK")]
+
+    async def scenario():
+        handler = make_handler()
+        # Client setup (CA bundle, transport imports) is not what is being timed
+        handler.currencies_handler._get_client()
+        try:
+            start = time.perf_counter()
+            replies = await handler.build_replies(pairs)
+            cold = time.perf_counter() - start
+            cold_requests = upstream.requests
+            repeated = await handler.build_replies(pairs)
+        finally:
+            await handler.currencies_handler.aclose()
+        return replies, cold, cold_requests, repeated
+
+    replies, cold, cold_requests, repeated = asyncio.run(scenario())
+
+    assert len(replies) == len(pairs)
+    assert cold_requests == len(pairs)
+    # One round trip for all five bases; fetched one after another they would take five
+    assert cold < 2 * LATENCY
+    assert upstream.requests == cold_requests
+    assert repeated == replies
+
+
+def test_stale_reply_is_not_memoized_under_a_newer_version(make_handler, tmp_path):
+    fetched_at = datetime.utcnow() - timedelta(seconds=3600 + 10)
+    RateCacheStore(str(tmp_path / "rates_cache.json")).save(fetched_at, {"USD": {"EUR": 0.5}})
+
+    async def scenario():
+        handler = make_handler()
+        currencies_handler = handler.currencies_handler
+        request = currencies_handler._request_rates_async
+
+        async def slow_eur(base):
+            # The stale USD row's background refresh lands while the message still waits for EUR
+            if base == "EUR":
+                await asyncio.sleep(LATENCY)
+            return await request(base)
+
+        currencies_handler._request_rates_async = slow_eur
+        try:
+            first = await handler.build_replies([(100, "USD"), (1, "EUR")])
+            second = await handler.build_replies([(100, "USD")])
+        finally:
+            await currencies_handler.aclose()
+        return first, second, currencies_handler.stale_served
+
+    first, second, stale_served = asyncio.run(scenario())
+
+    assert stale_served == 1
+    assert "<b>50</b>" in first[0]
+    assert "<b>92</b>" in second[0]
@@ -0,0 +1,18 @@
+import json
+from datetime import datetime
+from rate_cache import RateCacheStore
+
+
+def test_binary_cache_starts_from_the_json_file_and_leaves_it_alone(tmp_path):
+    legacy = tmp_path / "rates_cache.json"
+    fetched_at = datetime(2026, 1, 1, 12)
+    RateCacheStore(str(legacy)).save(fetched_at, {"USD": {"EUR": 0.92}})
+    store = RateCacheStore(str(tmp_path / "rates_cache.bin"), "binary", legacy_path=str(legacy))
+
+    migrated_at, migrated = store.load()
+    store.save(datetime(2026, 1, 1, 13), {"USD": {"EUR": 0.93}})
+
+    assert (migrated_at, migrated) == (fetched_at, {"USD": {"EUR": 0.92}})
+    assert store.load()[1]["USD"]["EUR"] == 0.93
+    # Readers of the old file still get JSON
+    assert json.loads(legacy.read_text())["rates"] == {"USD": {"EUR": 0.92}}
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from rate_cache import RateCacheStore
+
+
+def test_concurrent_lookups_share_one_fetch(upstream, make_handler):
+    callers = 300
+    upstream.latency = 0.2
+
+    async def scenario():
+        handler = make_handler().currencies_handler
+        try:
+            results = await asyncio.gather(*(handler.fetch_exchange_rates_async("USD") for _ in range(callers)))
+        finally:
+            await handler.aclose()
+        return handler, results
+
+    handler, results = asyncio.run(scenario())
+
+    assert upstream.requests == 1
+    assert handler.upstream_fetches == 1
+    assert handler.coalesced_fetches == callers - 1
+    assert all(rates == results[0] for rates in results)
+    assert results[0]["EUR"] == pytest.approx(0.92)
+
+
+def test_stale_hits_do_not_count_as_coalesced(upstream, make_handler, tmp_path):
+    fetched_at = datetime.utcnow() - timedelta(seconds=3600 + 10)
+    RateCacheStore(str(tmp_path / "rates_cache.json")).save(fetched_at, {"USD": {"EUR": 0.5}})
+    upstream.latency = 0.2
+
+    async def scenario():
+        handler = make_handler().currencies_handler
+        try:
+            # Answered from the stale row right away, none of them waits on the refresh they find in flight
+            results = [await handler.fetch_exchange_rates_async("USD") for _ in range(5)]
+        finally:
+            await handler.aclose()
+        return handler, results
+
+    handler, results = asyncio.run(scenario())
+
+    assert all(rates["EUR"] == 0.5 for rates in results)
+    assert handler.stale_served == 5
+    assert handler.upstream_fetches == 1
+    assert handler.coalesced_fetches == 0
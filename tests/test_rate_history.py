@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+from rate_history import RateHistory
+
+
+def test_processes_sharing_one_history_file(tmp_path):
+    # Two webhook workers open the same file, each with its own in-memory currency ids
+    path = str(tmp_path / "history.sqlite3")
+    first, second = RateHistory(path), RateHistory(path)
+    moment = datetime(2026, 1, 1)
+    try:
+        first.append("USD", moment, {"EUR": 0.9, "GBP": 0.8})
+        second.append("USD", moment + timedelta(seconds=10), {"EUR": 0.91, "JPY": 150.0})
+        second.append("CHF", moment, {"EUR": 1.05})
+
+        assert first.nearest("USD", moment + timedelta(seconds=9)) == (
+            moment + timedelta(seconds=10), {"EUR": 0.91, "JPY": 150.0})
+        assert first.nearest("CHF", moment) == (moment, {"EUR": 1.05})
+        assert [rates for _, rates in second.between("USD", moment, moment + timedelta(seconds=10))] == [
+            {"EUR": 0.9, "GBP": 0.8}, {"EUR": 0.91, "JPY": 150.0}]
+    finally:
+        first.close()
+        second.close()
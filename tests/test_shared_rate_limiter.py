@@ -0,0 +1,35 @@
+import asyncio
+import sqlite3
+import time
+from shared_rate_limiter import SharedRateLimiter
+
+
+def test_locked_database_does_not_stall_the_event_loop(tmp_path):
+    path = str(tmp_path / "limits.sqlite3")
+    limiter = SharedRateLimiter(path, limit=5, window=60)
+    # Another worker holds the write lock for a while
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def scenario():
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.create_task(ticker())
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.3, other.execute, "COMMIT")
+        allowed = await limiter.is_allowed_async(1)
+        ticking.cancel()
+        return allowed, ticks
+
+    allowed, ticks = asyncio.run(scenario())
+    other.close()
+    limiter.close()
+    assert allowed
+    # The check waited about 0.3 s for the lock while other coroutines kept running
+    assert len(ticks) > 10
+    assert max(later - earlier for earlier, later in zip(ticks, ticks[1:])) < 0.1
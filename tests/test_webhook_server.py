@@ -0,0 +1,111 @@
+import asyncio
+import json
+import httpx
+import pytest
+from telegram import User
+from telegram.ext import Application, ExtBot, InlineQueryHandler, MessageHandler, filters
+from webhook_server import InFlightUpdateProcessor, WebhookServer
+
+SECRET = "s3cret"
+
+
+def message_update(update_id: int, text: str) -> bytes:
+    return json.dumps({"update_id": update_id, "message": {
+        "message_id": update_id, "date": 0, "text": text,
+        "chat": {"id": 1, "type": "private"}, "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+    }}).encode("utf-8")
+
+
+@pytest.fixture(autouse=True)
+def offline_bot(monkeypatch):
+    # initialize() would ask Telegram for getMe
+    async def initialize(self):
+        self._bot_user = User(id=123456, is_bot=True, first_name="Test", username="test_bot")
+        self._initialized = True
+
+    monkeypatch.setattr(ExtBot, "initialize", initialize)
+
+
+def run_server(scenario, max_pending: int = 1000):
+    """Runs scenario(server, client, handled, release) against a WebhookServer on a free port"""
+    async def main():
+        handled = []
+        release = asyncio.Event()
+        release.set()
+
+        async def handle(update, context):
+            await release.wait()
+            handled.append(update.message.text)
+
+        application = (Application.builder().token("123456:webhook-test").updater(None)
+                       .concurrent_updates(InFlightUpdateProcessor(4)).build())
+        application.add_handler(MessageHandler(filters.TEXT, handle))
+        server = WebhookServer(application, host="127.0.0.1", port=0, secret_token=SECRET, max_pending=max_pending)
+        await server.start()
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}",
+                                         headers={"X-Telegram-Bot-Api-Secret-Token": SECRET}) as client:
+                await scenario(server, client, handled, release)
+        finally:
+            await server.stop()
+
+    asyncio.run(main())
+
+
+async def settled(server: WebhookServer):
+    while server.pending():
+        await asyncio.sleep(0.01)
+
+
+def test_update_is_accepted_and_handled():
+    async def scenario(server, client, handled, release):
+        response = await client.post("/telegram", content=message_update(1, "100 usd"))
+        await settled(server)
+        assert response.status_code == 200
+        assert handled == ["100 usd"]
+        assert server.get_stats() == {"received": 1, "rejected": 0, "pending": 0}
+
+    run_server(scenario)
+
+
+def test_bad_requests_are_rejected():
+    async def scenario(server, client, handled, release):
+        assert (await client.post("/telegram", content=b"{not json")).status_code == 400
+        assert (await client.post("/telegram", content=message_update(1, "100 usd"),
+                                  headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})).status_code == 403
+        assert (await client.get("/telegram")).status_code == 405
+        assert (await client.post("/elsewhere", content=message_update(2, "100 usd"))).status_code == 404
+        await settled(server)
+        assert handled == []
+
+    run_server(scenario)
+
+
+def test_backpressure_once_max_pending_updates_are_in_flight():
+    async def scenario(server, client, handled, release):
+        release.clear()
+        statuses = [(await client.post("/telegram", content=message_update(i, f"{i} usd"))).status_code
+                    for i in range(3)]
+        assert statuses == [200, 200, 503]
+        assert server.pending() == 2
+
+        release.set()
+        await settled(server)
+        assert sorted(handled) == ["0 usd", "1 usd"]
+        assert (await client.post("/telegram", content=message_update(3, "3 usd"))).status_code == 200
+
+    run_server(scenario, max_pending=2)
+
+
+def test_webhook_application_counts_inline_queries_until_answered(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TOKEN_BOT", "123456:webhook-test")
+    monkeypatch.setenv("RATES_HISTORY_FILE", "")
+    from app import build_application
+
+    application = build_application(webhook=True)
+    inline_handlers = [handler for handler in application.handlers[0] if isinstance(handler, InlineQueryHandler)]
+
+    assert isinstance(application.update_processor, InFlightUpdateProcessor)
+    # A non-blocking handler would return before the debounced answer, and the update would stop counting
+    assert [handler.block for handler in inline_handlers] == [True]
@@ -0,0 +1,194 @@
+import asyncio
+import hmac
+import json
+import logging
+import signal
+from http import HTTPStatus
+from telegram import Update
+from telegram.ext import Application, SimpleUpdateProcessor
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightUpdateProcessor(SimpleUpdateProcessor):
+    """
+    SimpleUpdateProcessor that counts updates from the moment WebhookServer enqueues them until their
+    handlers have returned, including updates still waiting for one of the max_concurrent_updates slots
+    """
+    __slots__ = ("in_flight",)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self.in_flight = 0
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        try:
+            await coroutine
+        finally:
+            self.in_flight -= 1
+
+
+class WebhookServer:
+    def __init__(self, application: Application, host: str = "0.0.0.0", port: int = 8443,
+                 url_path: str = "/telegram", secret_token: str = None, webhook_url: str = None,
+                 reuse_port: bool = False, max_pending: int = 1000, max_body_size: int = 1 << 20,
+                 metrics_path: str = None):
+        """
+        Minimal HTTP listener that feeds Telegram webhook updates into application. Updates are
+        handled concurrently, up to the application's concurrent_updates limit.
+        :param application: Application built with updater(None) and concurrent_updates(InFlightUpdateProcessor(...))
+        :param host: Interface to listen on
+        :param port: Port to listen on
+        :param url_path: Path Telegram posts updates to
+        :param secret_token: Expected X-Telegram-Bot-Api-Secret-Token header, not checked if None
+        :param webhook_url: Public URL registered with Telegram on start, nothing is registered if None
+        :param reuse_port: Set SO_REUSEPORT so several worker processes can share the port
+        :param max_pending: Updates queued or being handled beyond which requests get 503, so Telegram retries later
+        :param max_body_size: Largest accepted request body in bytes
+        :param metrics_path: Path serving METRICS in Prometheus text format on GET, off if None
+        """
+        if not isinstance(application.update_processor, InFlightUpdateProcessor):
+            raise ValueError("application must be built with concurrent_updates(InFlightUpdateProcessor(...))")
+        self.application = application
+        self.host = host
+        self.port = port
+        self.url_path = url_path
+        self.secret_token = secret_token
+        self.webhook_url = webhook_url
+        self.reuse_port = reuse_port
+        self.max_pending = max_pending
+        self.max_body_size = max_body_size
+        self.metrics_path = metrics_path
+        self.received = 0
+        self.rejected = 0
+        self._server = None
+        self._stopped = None
+
+    async def start(self):
+        """Initializes and starts the application, then starts listening"""
+        application = self.application
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        if self.webhook_url:
+            await application.bot.set_webhook(self.webhook_url, secret_token=self.secret_token,
+                                              allowed_updates=Update.ALL_TYPES)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  reuse_port=self.reuse_port)
+        # Port 0 picks a free port, report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._stopped = asyncio.Event()
+
+    async def stop(self):
+        """Stops listening, lets queued updates finish and shuts the application down"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        application = self.application
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+    async def serve_forever(self):
+        """Runs until SIGINT or SIGTERM"""
+        await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopped.set)
+        logger.info("Listening for webhook updates on %s:%s%s", self.host, self.port, self.url_path)
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # HTTP/1.1 with keep-alive: Telegram reuses its connections for further updates
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                length = int(headers.get("content-length", 0))
+                content_type, response = "text/plain", b""
+                if "transfer-encoding" in headers:
+                    status, keep_alive = HTTPStatus.LENGTH_REQUIRED, False
+                elif length > self.max_body_size:
+                    status, keep_alive = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, False
+                elif method == "GET" and self.metrics_path and target.split("?", 1)[0] == self.metrics_path:
+                    await reader.readexactly(length)
+                    status, response = HTTPStatus.OK, METRICS.render().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                else:
+                    body = await reader.readexactly(length)
+                    status = await self._handle_request(method, target, headers, body)
+
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Length: {len(response)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + response
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            # Malformed request or client gone, nothing sensible to answer
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, method: str, target: str, headers: dict, body: bytes) -> HTTPStatus:
+        if target.split("?", 1)[0] != self.url_path:
+            return HTTPStatus.NOT_FOUND
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED
+        if self.secret_token is not None and not hmac.compare_digest(
+                headers.get("x-telegram-bot-api-secret-token", "").encode(), self.secret_token.encode()):
+            self.rejected += 1
+            return HTTPStatus.FORBIDDEN
+        if self.pending() >= self.max_pending:
+            self.rejected += 1
+            return HTTPStatus.SERVICE_UNAVAILABLE
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            self.rejected += 1
+            return HTTPStatus.BAD_REQUEST
+
+        # Answered right away, the application works through the queue on its own tasks
+        self.application.update_processor.in_flight += 1
+        await self.application.update_queue.put(update)
+        self.received += 1
+        return HTTPStatus.OK
+
+    def pending(self) -> int:
+        """
+        Updates accepted whose handlers have not returned yet. With concurrent updates the application
+        takes every update off the queue at once and starts a task for it, so qsize() stays near zero
+        while tasks pile up.
+        """
+        return self.application.update_processor.in_flight
+
+    def get_stats(self) -> dict:
+        """Accepted and rejected requests, and updates not yet fully handled"""
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "pending": self.pending(),
+        }
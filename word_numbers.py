@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 # Word to number mapping
 WORD_NUMBERS = {
     # Basic numbers
@@ -29,31 +31,124 @@ WORD_NUMBERS = {
 }
 
 def word_to_number(word_str: str) -> float:
-    """Convert word numbers to actual numbers"""
-    words = word_str.lower().split()
-    total = 0
-    current = 0
+    """Convert word numbers to actual numbers, e.g. "двести пятьдесят тысяч" -> 250000.0"""
+    words = [word for word in word_str.lower().split() if word in NUMBER_TOKENS]
+    return float(phrase_value(" ".join(words)) or 0)
+
+
+# Token kinds of the number phrase state machine
+UNIT, TEEN, TEN, HUNDREDS, HUNDRED, SCALE, ABBREVIATION, CONNECTOR, ARTICLE = range(9)
+
+# Inflected and extra forms on top of WORD_NUMBERS; "ё" spellings are listed separately since text is only lower-cased
+EXTRA_NUMBER_WORDS = {
+    'ноль': 0, 'одного': 1, 'одной': 1, 'одну': 1, 'полтора': 1.5, 'полторы': 1.5,
+    'двух': 2, 'трех': 3, 'трёх': 3, 'четырех': 4, 'четырёх': 4, 'пяти': 5, 'шести': 6,
+    'семи': 7, 'восьми': 8, 'девяти': 9, 'десяти': 10,
+    'одиннадцати': 11, 'двенадцати': 12, 'тринадцати': 13, 'четырнадцати': 14, 'пятнадцати': 15,
+    'шестнадцати': 16, 'семнадцати': 17, 'восемнадцати': 18, 'девятнадцати': 19,
+    'двадцати': 20, 'тридцати': 30, 'сорока': 40, 'пятидесяти': 50, 'шестидесяти': 60,
+    'семидесяти': 70, 'восьмидесяти': 80, 'девяноста': 90,
+    'ста': 100, 'двухсот': 200, 'трехсот': 300, 'трёхсот': 300, 'четырехсот': 400, 'четырёхсот': 400,
+    'пятисот': 500, 'шестисот': 600, 'семисот': 700, 'восьмисот': 800, 'девятисот': 900,
+    'тысячу': 1000, 'тысячей': 1000, 'тыс': 1000, 'thousands': 1000,
+    'million': 1000000, 'millions': 1000000, 'mil': 1000000, 'миллион': 1000000, 'миллиона': 1000000,
+    'миллионов': 1000000, 'млн': 1000000, 'лям': 1000000, 'ляма': 1000000, 'лямов': 1000000,
+    'лимон': 1000000, 'лимона': 1000000, 'лимонов': 1000000,
+    'billion': 1000000000, 'billions': 1000000000, 'миллиард': 1000000000, 'миллиарда': 1000000000,
+    'миллиардов': 1000000000, 'млрд': 1000000000,
+}
+
+
+def _kind(word: str, value: float) -> int:
+    if word == 'hundred':
+        return HUNDRED
+    if value >= 1000:
+        return SCALE
+    if value >= 100:
+        return HUNDREDS
+    if value >= 20:
+        return TEN
+    if value >= 10:
+        return TEEN
+    return UNIT
+
+
+# word -> (value, kind) for every token the number phrase state machine understands
+NUMBER_TOKENS = {word: (value, _kind(word, value)) for word, value in {**WORD_NUMBERS, **EXTRA_NUMBER_WORDS}.items()}
+NUMBER_TOKENS.update({'and': (0, CONNECTOR), 'и': (0, CONNECTOR), 'a': (1, ARTICLE)})
+# One letter scales only count right after a number ("three m euros"), on their own they are just letters
+NUMBER_TOKENS.update({'k': (1000, ABBREVIATION), 'к': (1000, ABBREVIATION),
+                      'm': (1000000, ABBREVIATION), 'м': (1000000, ABBREVIATION)})
 
-    for word in words:
-        if word in ['and', 'и']:
+# Words that make up an amount on their own, abbreviations, connectors and articles don't
+AMOUNT_WORDS = [word for word, (_, kind) in NUMBER_TOKENS.items() if kind not in (ABBREVIATION, CONNECTOR, ARTICLE)]
+
+# Kinds each kind may follow inside one number, None being the start of a number
+_MAY_FOLLOW = {
+    UNIT: {None, TEN, HUNDREDS, HUNDRED, SCALE},
+    TEEN: {None, HUNDREDS, HUNDRED, SCALE},
+    TEN: {None, HUNDREDS, HUNDRED, SCALE},
+    HUNDREDS: {None, SCALE},
+    HUNDRED: {None, UNIT, TEEN, ARTICLE},
+    SCALE: {None, UNIT, TEEN, TEN, HUNDREDS, HUNDRED, ARTICLE},
+    ABBREVIATION: {UNIT, TEEN, TEN, HUNDREDS, HUNDRED},
+}
+
+
+def _continues(last, last_scale: float, word: str) -> bool:
+    value, kind = NUMBER_TOKENS[word]
+    if kind not in _MAY_FOLLOW or last not in _MAY_FOLLOW[kind]:
+        return False
+    # "миллион пятьсот тысяч" is fine, "тысяча миллионов" starts a new number
+    return kind not in (SCALE, ABBREVIATION) or value < last_scale
+
+
+@lru_cache(maxsize=4096)
+def phrase_value(phrase: str):
+    """
+    Value of the last number in a run of number words, e.g. "two hundred fifty" -> 250,
+    "двести пятьдесят тысяч" -> 250000, "five six" -> 6
+    :param phrase: Lower-cased NUMBER_TOKENS words separated by single spaces
+    :return: The value, or None if the run does not end in a complete number
+    """
+    words = phrase.split()
+    total = group = 0
+    last, last_scale = None, float("inf")
+    for i, word in enumerate(words):
+        value, kind = NUMBER_TOKENS[word]
+        following = words[i + 1] if i + 1 < len(words) else None
+
+        if kind == CONNECTOR:
+            # Joins the parts of one number ("one hundred and five"), anywhere else it separates numbers
+            if last is None or following is None or not _continues(last, last_scale, following):
+                total = group = 0
+                last, last_scale = None, float("inf")
             continue
+        if (kind == ARTICLE and (following is None or NUMBER_TOKENS[following][1] not in (HUNDRED, SCALE))
+                or kind == ABBREVIATION and last not in _MAY_FOLLOW[ABBREVIATION]):
+            # "a" counts only as in "a hundred" or "a thousand", "k" only as in "five k"
+            total = group = 0
+            last, last_scale = None, float("inf")
+            continue
+
+        if kind in (SCALE, ABBREVIATION) and last in _MAY_FOLLOW[kind] and value >= last_scale:
+            # "тысяча три миллиона": the scale is out of order, so the last group starts a new number
+            total = 0
+            last_scale = float("inf")
+        elif kind == ARTICLE or not _continues(last, last_scale, word):
+            # This word starts a new number
+            total = group = 0
+            last_scale = float("inf")
+        if kind == HUNDRED:
+            group = (group or 1) * 100
+        elif kind in (SCALE, ABBREVIATION):
+            total += (group or 1) * value
+            group = 0
+            last_scale = value
+        else:
+            group += value
+        last = kind
 
-        if word in WORD_NUMBERS:
-            num = WORD_NUMBERS[word]
-            if num == 100:  # handle hundreds
-                if current == 0:
-                    current = 1
-                current *= num
-            elif num == 1000:  # handle thousands
-                if current == 0:
-                    current = 1
-                current *= num
-                total += current
-                current = 0
-            else:
-                if current == 0:
-                    current = num
-                else:
-                    current += num
-
-    return float(total + current)
+    if last is None:
+        return None
+    return total + group